@@ -3,13 +3,22 @@ Configuration settings for UID Matcher Reflex App
 """
 
 import os
-from typing import Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Any
 
 # ============= ENVIRONMENT VARIABLES =============
 
-def get_env_config() -> Dict[str, Any]:
-    """Get configuration from environment variables"""
-    return {
+def _freeze(value: Any) -> Any:
+    """Recursively wrap dicts in read-only mapping proxies"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+@lru_cache(maxsize=1)
+def get_env_config() -> Mapping[str, Any]:
+    """Get configuration from environment variables (read once, read-only)"""
+    return _freeze({
         # SurveyMonkey Configuration
         "surveymonkey": {
             "access_token": os.getenv("SURVEYMONKEY_ACCESS_TOKEN"),
@@ -31,8 +40,9 @@ def get_env_config() -> Dict[str, Any]:
             "environment": os.getenv("APP_ENV", "development"),
             "log_level": os.getenv("LOG_LEVEL", "INFO"),
             "debug": os.getenv("DEBUG", "false").lower() == "true",
+            "cache_dir": os.getenv("UID_CACHE_DIR", "~/.cache/uid_matcher"),
         }
-    }
+    })
 
 # ============= EXAMPLE ENVIRONMENT VARIABLES =============
 """
@@ -54,4 +64,5 @@ SNOWFLAKE_ROLE=your_role
 APP_ENV=development
 LOG_LEVEL=INFO
 DEBUG=false
+UID_CACHE_DIR=~/.cache/uid_matcher
 """ 
\ No newline at end of file
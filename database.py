@@ -1,49 +1,283 @@
 """
 Database operations for UID Matcher Reflex App
 Handles Snowflake and SurveyMonkey API connections
+
+The question bank is read from pre-aggregated Snowflake views instead of
+grouping the full responses table on every call. Create them once with:
+
+    CREATE MATERIALIZED VIEW AMI_DBT.DBT_SURVEY_MONKEY.QUESTION_BANK_AGG AS
+    SELECT HEADING_0, MAX(UID) AS UID
+    FROM AMI_DBT.DBT_SURVEY_MONKEY.SURVEY_DETAILS_RESPONSES_COMBINED_LIVE
+    WHERE HEADING_0 IS NOT NULL AND UID IS NOT NULL
+    GROUP BY HEADING_0;
+
+    CREATE MATERIALIZED VIEW AMI_DBT.DBT_SURVEY_MONKEY.QUESTION_BANK_AUTHORITY_AGG AS
+    SELECT HEADING_0, UID, COUNT(*) AS AUTHORITY_COUNT
+    FROM AMI_DBT.DBT_SURVEY_MONKEY.SURVEY_DETAILS_RESPONSES_COMBINED_LIVE
+    WHERE UID IS NOT NULL AND HEADING_0 IS NOT NULL
+    AND TRIM(HEADING_0) != ''
+    GROUP BY HEADING_0, UID;
 """
 
+import atexit
 import os
+import re
+import time
+import threading
+import orjson
 import pandas as pd
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from cachetools import TTLCache, cached
+from cachetools.func import ttl_cache
+from cachetools.keys import hashkey
 from sqlalchemy import create_engine, text
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from typing import Tuple, List, Dict, Optional
+from sqlalchemy.sql.elements import TextClause
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception_type
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Callable, Tuple, List, Dict, Iterator, Optional, TypeVar
+from config import get_env_config
+
+try:
+    import snowflake.connector as snowflake_connector
+    from snowflake.connector.pandas_tools import write_pandas
+except ImportError:
+    snowflake_connector = None
+    write_pandas = None
 
 logger = logging.getLogger(__name__)
 
+# Pre-aggregated question bank views (see module docstring for DDL)
+QB_VIEW = "AMI_DBT.DBT_SURVEY_MONKEY.QUESTION_BANK_AGG"
+QB_AUTH_VIEW = "AMI_DBT.DBT_SURVEY_MONKEY.QUESTION_BANK_AUTHORITY_AGG"
+
+# Native connector connections kept open for question bank reads
+NATIVE_POOL_SIZE = 3
+# Concurrent partition queries for a full question bank load; one per pooled connection
+QB_PARTITIONS = NATIVE_POOL_SIZE
+
+# Question bank results change slowly, so cache them in-process
+# (the full bank, the authority bank, and each partition)
+QB_CACHE_TTL = 900
+_qb_cache = TTLCache(maxsize=2 + QB_PARTITIONS, ttl=QB_CACHE_TTL)
+_qb_cache_lock = threading.RLock()
+
+# On-disk copies of slow-changing query results survive app restarts
+QB_DISK_CACHE_HOURS = 12
+SURVEY_DETAILS_CACHE_HOURS = 6
+
+# How long a successful Snowflake health probe is reused
+SF_HEALTH_TTL = 60
+
+# Question bank statements, built once and reused for every call
+_QB_STMT = text(f"""
+    SELECT HEADING_0 AS "HEADING_0", UID AS "UID"
+    FROM {QB_VIEW}
+""")
+
+# One hash partition of the question bank; partitions are disjoint and together
+# cover every row, so they can be fetched concurrently and concatenated.
+_QB_PARTITION_STMT = text(f"""
+    SELECT HEADING_0 AS "HEADING_0", UID AS "UID"
+    FROM {QB_VIEW}
+    WHERE MOD(ABS(HASH(HEADING_0)), :parts) = :part
+""")
+
+_QB_AUTH_STMT = text(f"""
+    SELECT HEADING_0, UID, AUTHORITY_COUNT
+    FROM {QB_AUTH_VIEW}
+    ORDER BY UID, AUTHORITY_COUNT DESC
+""")
+
+_NAMED_PARAM_RE = re.compile(r"(?<![:\w]):(\w+)")
+
+@lru_cache(maxsize=None)
+def _to_pyformat(query: str) -> str:
+    """Convert SQLAlchemy :name bind params to the connector's %(name)s style"""
+    return _NAMED_PARAM_RE.sub(r"%(\1)s", query)
+
+# Longest we will sleep on a SurveyMonkey rate-limit reset before retrying
+MAX_RATE_LIMIT_WAIT = 60.0
+
+_backoff_wait = wait_exponential_jitter(initial=1, max=10)
+
+def _rate_limit_wait(retry_state) -> float:
+    """Wait as long as SurveyMonkey's rate-limit headers ask, else back off with jitter"""
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, "response", None)
+    if response is not None:
+        for header in ("Retry-After", "X-Ratelimit-Reset"):
+            try:
+                reset = float(response.headers.get(header, ""))
+            except ValueError:
+                continue
+            # Accept both an epoch timestamp and a seconds-until-reset value
+            if reset > 1e9:
+                reset -= time.time()
+            return min(max(reset, 0.0), MAX_RATE_LIMIT_WAIT)
+    return _backoff_wait(retry_state)
+
+# Shared retry policy for SurveyMonkey requests
+_sm_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=_rate_limit_wait,
+    retry=retry_if_exception_type(requests.HTTPError),
+    reraise=True
+)
+
+def get_cache_dir() -> Path:
+    """Directory for on-disk caches, resolved from the environment on first use"""
+    return Path(get_env_config()["app"]["cache_dir"]).expanduser()
+
+T = TypeVar("T")
+
+def _file_cached(path: Path, ttl_hours: float, load: Callable[[Path], T],
+                 query_fn: Callable[[], Optional[T]], dump: Callable[[T, Path], None]) -> Optional[T]:
+    """Load a result from path if fresher than ttl_hours, else query it and store it atomically
+
+    None results are not stored, so a failed query is retried on the next call.
+    """
+    try:
+        if time.time() - path.stat().st_mtime < ttl_hours * 3600:
+            return load(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+    
+    result = query_fn()
+    if result is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            dump(result, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache file {path}: {e}")
+    return result
+
+def _read_cached_or_query(name: str, ttl_hours: float, query_fn: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Load a DataFrame from the cache dir if fresher than ttl_hours, else query and store it"""
+    return _file_cached(
+        get_cache_dir() / f"{name}.parquet",
+        ttl_hours,
+        pd.read_parquet,
+        query_fn,
+        lambda df, path: df.to_parquet(path, compression="zstd", compression_level=3),
+    )
+
+@ttl_cache(maxsize=1, ttl=SF_HEALTH_TTL)
+def _snowflake_version(engine) -> str:
+    """Probe Snowflake for its version; successful probes are reused for SF_HEALTH_TTL seconds"""
+    # Keyed by the engine object, so a rebuilt engine is probed afresh.
+    # pool_pre_ping already validates pooled connections on checkout.
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT CURRENT_VERSION()")).scalar()
+
+# 429s never get here: _sm_get retries them and raises once retries run out
+_SM_ERROR_MESSAGES = {
+    401: "Authentication failed - invalid token",
+}
+
+def _sm_error_message(response: requests.Response) -> str:
+    """Describe a failed SurveyMonkey response"""
+    return _SM_ERROR_MESSAGES.get(response.status_code, f"API error: {response.status_code}")
+
+def _handle_sm_response(response: requests.Response) -> Optional[Dict]:
+    """Parse a successful SurveyMonkey response, or log the failure and return None"""
+    if response.status_code == 200:
+        return orjson.loads(response.content)
+    
+    logger.error(f"SurveyMonkey request to {response.url} failed: {_sm_error_message(response)}")
+    return None
+
 class DatabaseManager:
     """Manages database connections and operations"""
     
     def __init__(self):
-        self.snowflake_engine = None
-        self.surveymonkey_token = None
-        self._initialize_connections()
+        # Idle native connections for analytic reads (see _native_connection)
+        self._native_idle: List = []
+        self._native_lock = threading.Lock()
+        atexit.register(self._cleanup)
+    
+    def _cleanup(self):
+        """Release pooled connections so Snowflake sessions don't linger after exit"""
+        # Only touch resources that were actually created; the cached
+        # properties would otherwise build them just to close them.
+        engine = self.__dict__.get("snowflake_engine")
+        if engine is not None:
+            try:
+                engine.dispose()
+            except Exception:
+                pass
+        
+        session = self.__dict__.get("sm_session")
+        if session is not None:
+            try:
+                session.close()
+            except Exception:
+                pass
+        
+        with self._native_lock:
+            idle, self._native_idle = self._native_idle, []
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
     
-    def _initialize_connections(self):
-        """Initialize database connections"""
+    @cached_property
+    def surveymonkey_token(self) -> Optional[str]:
+        """SurveyMonkey access token, read on first use"""
+        return get_env_config()["surveymonkey"]["access_token"]
+    
+    @cached_property
+    def sm_session(self) -> requests.Session:
+        """Pooled HTTP session for SurveyMonkey, reused across API calls"""
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+        session.headers.update({
+            "Authorization": f"Bearer {self.surveymonkey_token}",
+            "Content-Type": "application/json"
+        })
+        return session
+    
+    @cached_property
+    def snowflake_engine(self):
+        """Snowflake engine, built on first use"""
         try:
-            self.surveymonkey_token = os.getenv("SURVEYMONKEY_ACCESS_TOKEN")
-            
             # Snowflake connection string
-            sf_user = os.getenv("SNOWFLAKE_USER")
-            sf_password = os.getenv("SNOWFLAKE_PASSWORD")
-            sf_account = os.getenv("SNOWFLAKE_ACCOUNT")
-            sf_database = os.getenv("SNOWFLAKE_DATABASE")
-            sf_schema = os.getenv("SNOWFLAKE_SCHEMA")
-            sf_warehouse = os.getenv("SNOWFLAKE_WAREHOUSE")
-            sf_role = os.getenv("SNOWFLAKE_ROLE")
-            
-            if all([sf_user, sf_password, sf_account, sf_database, sf_schema, sf_warehouse, sf_role]):
+            sf = get_env_config()["snowflake"]
+            
+            if all(sf.values()):
                 connection_string = (
-                    f"snowflake://{sf_user}:{sf_password}@{sf_account}/"
-                    f"{sf_database}/{sf_schema}?warehouse={sf_warehouse}&role={sf_role}"
+                    f"snowflake://{sf['user']}:{sf['password']}@{sf['account']}/"
+                    f"{sf['database']}/{sf['schema']}?warehouse={sf['warehouse']}&role={sf['role']}"
                 )
-                self.snowflake_engine = create_engine(connection_string)
+                return self._build_engine(connection_string)
                 
         except Exception as e:
-            logger.error(f"Failed to initialize connections: {e}")
+            logger.error(f"Failed to initialize Snowflake engine: {e}")
+        return None
+    
+    @staticmethod
+    def _build_engine(connection_string: str):
+        """Create the Snowflake engine with explicit connection pool settings"""
+        # Snowflake connections pay a costly auth handshake, so keep a small
+        # pool of reusable connections and recycle them before the server
+        # purges idle sessions. pool_pre_ping drops stale connections on checkout.
+        return create_engine(
+            connection_string,
+            pool_size=5,
+            max_overflow=5,
+            pool_recycle=3600,
+            pool_timeout=120,
+            pool_pre_ping=True,
+        )
     
     def check_snowflake_connection(self) -> Tuple[bool, str]:
         """Check Snowflake connection status"""
@@ -51,38 +285,35 @@ class DatabaseManager:
             if not self.snowflake_engine:
                 return False, "No Snowflake configuration found"
             
-            with self.snowflake_engine.connect() as conn:
-                result = conn.execute(text("SELECT CURRENT_VERSION()"))
-                version = result.fetchone()[0]
-                return True, f"Connected to Snowflake version {version}"
+            version = _snowflake_version(self.snowflake_engine)
+            return True, f"Connected to Snowflake version {version}"
         except Exception as e:
             return False, f"Connection failed: {str(e)}"
     
+    @_sm_retry
+    def _sm_get(self, url: str) -> requests.Response:
+        """GET a SurveyMonkey endpoint, raising HTTPError on 429/5xx so it is retried"""
+        response = self.sm_session.get(url, timeout=10)
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            raise requests.HTTPError(f"{response.status_code} from SurveyMonkey", response=response)
+        
+        return response
+    
     def check_surveymonkey_connection(self) -> Tuple[bool, str]:
         """Check SurveyMonkey API connection"""
         try:
             if not self.surveymonkey_token:
                 return False, "No SurveyMonkey token found"
             
-            headers = {
-                "Authorization": f"Bearer {self.surveymonkey_token}",
-                "Content-Type": "application/json"
-            }
+            response = self._sm_get("https://api.surveymonkey.com/v3/users/me")
             
-            response = requests.get(
-                "https://api.surveymonkey.com/v3/users/me",
-                headers=headers,
-                timeout=10
-            )
+            user_data = _handle_sm_response(response)
+            if user_data is None:
+                return False, _sm_error_message(response)
             
-            if response.status_code == 200:
-                user_data = response.json()
-                username = user_data.get("username", "Unknown")
-                return True, f"Connected as {username}"
-            elif response.status_code == 401:
-                return False, "Authentication failed - invalid token"
-            else:
-                return False, f"API error: {response.status_code}"
+            username = user_data.get("username", "Unknown")
+            return True, f"Connected as {username}"
                 
         except Exception as e:
             return False, f"Connection failed: {str(e)}"
@@ -94,24 +325,15 @@ class DatabaseManager:
                 return []
             
             url = "https://api.surveymonkey.com/v3/surveys"
-            headers = {"Authorization": f"Bearer {self.surveymonkey_token}"}
-            response = requests.get(url, headers=headers)
+            response = self._sm_get(url)
             
-            if response.status_code == 200:
-                return response.json().get("data", [])
-            else:
-                logger.error(f"Failed to get surveys: {response.status_code}")
-                return []
+            surveys = _handle_sm_response(response)
+            return surveys.get("data", []) if surveys else []
                 
         except Exception as e:
             logger.error(f"Error getting surveys: {e}")
             return []
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(requests.HTTPError)
-    )
     def get_survey_details(self, survey_id: str) -> Optional[Dict]:
         """Get detailed survey information"""
         try:
@@ -119,78 +341,215 @@ class DatabaseManager:
                 return None
             
             url = f"https://api.surveymonkey.com/v3/surveys/{survey_id}/details"
-            headers = {"Authorization": f"Bearer {self.surveymonkey_token}"}
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 429:
-                raise requests.HTTPError("429 Too Many Requests")
-            
-            response.raise_for_status()
-            return response.json()
+            response = self._sm_get(url)
+            return _handle_sm_response(response)
             
         except Exception as e:
             logger.error(f"Error getting survey details for {survey_id}: {e}")
             return None
     
-    def get_question_bank(self, limit: int = 10000, offset: int = 0) -> pd.DataFrame:
-        """Get question bank from Snowflake"""
+    def get_survey_details_cached(self, survey_id: str,
+                                  ttl_hours: float = SURVEY_DETAILS_CACHE_HOURS) -> Optional[Dict]:
+        """Get survey details, reusing a copy in the cache dir if fresher than ttl_hours"""
+        return _file_cached(
+            get_cache_dir() / "survey_details" / f"{survey_id}.json",
+            ttl_hours,
+            lambda path: orjson.loads(path.read_bytes()),
+            lambda: self.get_survey_details(survey_id),
+            lambda details, path: path.write_bytes(orjson.dumps(details)),
+        )
+    
+    def get_survey_details_bulk(self, survey_ids: List[str], max_workers: int = 8) -> Dict[str, Dict]:
+        """Get details for several surveys concurrently"""
+        # Keep max_workers within the session's pool_maxsize so every worker
+        # gets a pooled connection.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(self.get_survey_details, survey_ids)
+            return {
+                survey_id: details
+                for survey_id, details in zip(survey_ids, results)
+                if details
+            }
+    
+    @contextmanager
+    def _native_connection(self):
+        """Borrow a native Snowflake connection from a small reusable pool"""
+        with self._native_lock:
+            conn = self._native_idle.pop() if self._native_idle else None
+        if conn is None or conn.is_closed():
+            conn = snowflake_connector.connect(**get_env_config()["snowflake"])
+        
+        try:
+            yield conn
+        finally:
+            with self._native_lock:
+                if not conn.is_closed() and len(self._native_idle) < NATIVE_POOL_SIZE:
+                    self._native_idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+    
+    def _iter_dataframes(self, stmt: TextClause, params: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """Stream a query result as Arrow-backed DataFrame batches sized by the connector"""
+        # Read straight from the native connector, skipping SQLAlchemy's row
+        # machinery. The snowflake:// engine needs the connector too, so it is
+        # always installed whenever snowflake_engine exists.
+        with self._native_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(_to_pyformat(stmt.text), params)
+                yield from cursor.fetch_pandas_batches()
+            finally:
+                cursor.close()
+    
+    def _read_dataframe(self, stmt: TextClause, params: Optional[Dict] = None,
+                        columns: Tuple[str, ...] = ()) -> pd.DataFrame:
+        """Run a query and concatenate its streamed batches into one DataFrame"""
+        batches = list(self._iter_dataframes(stmt, params))
+        if not batches:
+            return pd.DataFrame(columns=list(columns))
+        return pd.concat(batches, ignore_index=True)
+    
+    @staticmethod
+    def _narrow_authority_dtypes(result: pd.DataFrame) -> pd.DataFrame:
+        """Normalize column case and narrow dtypes of a question bank authority frame"""
+        result.columns = result.columns.str.upper()
+        
+        # Narrow dtypes: UIDs repeat heavily and counts fit small unsigned ints
+        result["HEADING_0"] = result["HEADING_0"].astype("string[pyarrow]")
+        result["UID"] = result["UID"].astype("category")
+        result["AUTHORITY_COUNT"] = pd.to_numeric(result["AUTHORITY_COUNT"], downcast="unsigned")
+        return result
+    
+    @staticmethod
+    def _narrow_question_bank_dtypes(result: pd.DataFrame) -> pd.DataFrame:
+        """Narrow dtypes of a question bank frame: UIDs repeat heavily across headings"""
+        result["HEADING_0"] = result["HEADING_0"].astype("string[pyarrow]")
+        result["UID"] = result["UID"].astype("category")
+        return result
+    
+    @cached(_qb_cache, key=lambda self: hashkey("question_bank"), lock=_qb_cache_lock)
+    def _query_question_bank(self) -> pd.DataFrame:
+        """Query the whole question bank in one scan, cached in memory and on disk"""
+        def query() -> pd.DataFrame:
+            return self._read_dataframe(_QB_STMT, columns=("HEADING_0", "UID"))
+        
+        result = _read_cached_or_query("question_bank", QB_DISK_CACHE_HOURS, query)
+        return self._narrow_question_bank_dtypes(result)
+    
+    def get_all_question_bank(self) -> pd.DataFrame:
+        """Get the whole question bank from Snowflake"""
         try:
             if not self.snowflake_engine:
                 return pd.DataFrame()
             
-            query = """
-                SELECT HEADING_0, MAX(UID) AS UID
-                FROM AMI_DBT.DBT_SURVEY_MONKEY.SURVEY_DETAILS_RESPONSES_COMBINED_LIVE
-                WHERE HEADING_0 IS NOT NULL AND UID IS NOT NULL
-                GROUP BY HEADING_0
-                LIMIT :limit OFFSET :offset
-            """
-            
-            with self.snowflake_engine.connect() as conn:
-                result = pd.read_sql(text(query), conn, params={"limit": limit, "offset": offset})
-            
-            result.columns = result.columns.str.lower()
-            result = result.rename(columns={'heading_0': 'HEADING_0', 'uid': 'UID'})
-            return result
+            return self._query_question_bank()
             
         except Exception as e:
             logger.error(f"Failed to get question bank: {e}")
             return pd.DataFrame()
     
+    def get_question_bank(self, limit: int = 10000, offset: int = 0) -> pd.DataFrame:
+        """Get one page of the question bank, copied out of the cached full bank"""
+        # A copy, so callers that modify the page cannot corrupt the shared bank
+        return self.get_all_question_bank().iloc[offset:offset + limit].copy()
+    
+    @cached(_qb_cache, key=lambda self, part, parts: hashkey("question_bank_partition", part, parts),
+            lock=_qb_cache_lock)
+    def _query_question_bank_partition(self, part: int, parts: int) -> pd.DataFrame:
+        """Query one hash partition of the question bank, cached in memory and on disk"""
+        def query() -> pd.DataFrame:
+            return self._read_dataframe(_QB_PARTITION_STMT, {"part": part, "parts": parts},
+                                        columns=("HEADING_0", "UID"))
+        
+        result = _read_cached_or_query(f"question_bank_part_{part}_of_{parts}", QB_DISK_CACHE_HOURS, query)
+        return self._narrow_question_bank_dtypes(result)
+    
+    def get_question_bank_partition(self, part: int, parts: int = QB_PARTITIONS) -> pd.DataFrame:
+        """Get one of `parts` disjoint hash partitions of the question bank
+
+        Unlike the other getters this raises on failure, since dropping one
+        partition would silently truncate the assembled bank.
+        """
+        if not self.snowflake_engine:
+            return pd.DataFrame()
+        
+        try:
+            return self._query_question_bank_partition(part, parts)
+        except Exception as e:
+            logger.error(f"Failed to get question bank partition {part}/{parts}: {e}")
+            raise
+    
+    def iter_question_bank(self) -> Iterator[pd.DataFrame]:
+        """Yield the question bank in batches from a single server-side scan"""
+        if not self.snowflake_engine:
+            return
+        
+        for batch in self._iter_dataframes(_QB_STMT):
+            yield self._narrow_question_bank_dtypes(batch)
+    
+    @cached(_qb_cache, key=lambda self: hashkey("question_bank_with_authority"), lock=_qb_cache_lock)
+    def _query_question_bank_with_authority(self) -> pd.DataFrame:
+        """Query the question bank with authority counts, cached in memory and on disk"""
+        def query() -> pd.DataFrame:
+            return self._read_dataframe(_QB_AUTH_STMT, columns=("HEADING_0", "UID", "AUTHORITY_COUNT"))
+        
+        # Narrowed after the parquet round-trip too, so a disk hit has the same dtypes
+        result = _read_cached_or_query("question_bank_with_authority", QB_DISK_CACHE_HOURS, query)
+        return self._narrow_authority_dtypes(result)
+    
     def get_question_bank_with_authority(self) -> pd.DataFrame:
         """Get question bank with authority count"""
         try:
             if not self.snowflake_engine:
                 return pd.DataFrame()
             
-            query = """
-            SELECT 
-                HEADING_0, 
-                UID, 
-                COUNT(*) as AUTHORITY_COUNT
-            FROM AMI_DBT.DBT_SURVEY_MONKEY.SURVEY_DETAILS_RESPONSES_COMBINED_LIVE
-            WHERE UID IS NOT NULL AND HEADING_0 IS NOT NULL 
-            AND TRIM(HEADING_0) != ''
-            GROUP BY HEADING_0, UID
-            ORDER BY UID, AUTHORITY_COUNT DESC
-            """
-            
-            with self.snowflake_engine.connect() as conn:
-                result = pd.read_sql(text(query), conn)
-            
-            result.columns = result.columns.str.upper()
-            return result
+            return self._query_question_bank_with_authority()
             
         except Exception as e:
             logger.error(f"Failed to get question bank with authority: {e}")
             return pd.DataFrame()
     
+    def iter_question_bank_with_authority(self) -> Iterator[pd.DataFrame]:
+        """Yield the question bank with authority count in batches, for incremental processing"""
+        if not self.snowflake_engine:
+            return
+        
+        for batch in self._iter_dataframes(_QB_AUTH_STMT):
+            yield self._narrow_authority_dtypes(batch)
+    
+    def refresh_question_bank(self):
+        """Drop cached question bank results so the next call re-queries Snowflake"""
+        with _qb_cache_lock:
+            _qb_cache.clear()
+        for path in get_cache_dir().glob("question_bank*.parquet"):
+            path.unlink(missing_ok=True)
+    
     def upload_dataframe_to_snowflake(self, df: pd.DataFrame, table_name: str) -> bool:
         """Upload DataFrame to Snowflake"""
         try:
             if not self.snowflake_engine or df.empty:
                 return False
             
+            if write_pandas is not None:
+                # Stage as Parquet and COPY INTO instead of row-wise INSERTs
+                raw = self.snowflake_engine.raw_connection()
+                try:
+                    connection = getattr(raw, "dbapi_connection", None) or raw.connection
+                    success, _, _, _ = write_pandas(
+                        connection,
+                        df,
+                        table_name.upper(),
+                        auto_create_table=True,
+                        overwrite=True,
+                        use_logical_type=True,
+                        # Unquoted like to_sql, so columns stay case-insensitive
+                        quote_identifiers=False
+                    )
+                    return success
+                finally:
+                    raw.close()
+            
             df.to_sql(
                 table_name,
                 self.snowflake_engine,
@@ -204,5 +563,16 @@ class DatabaseManager:
             logger.error(f"Failed to upload to Snowflake: {e}")
             return False
 
-# Global database manager instance
-db_manager = DatabaseManager() 
\ No newline at end of file
+# Global database manager instance, created on first use
+_instance: Optional[DatabaseManager] = None
+_instance_lock = threading.Lock()
+
+def get_db_manager() -> DatabaseManager:
+    """Return the shared DatabaseManager, creating it on first call"""
+    global _instance
+    if _instance is None:
+        # Called from several worker threads at once; build exactly one manager
+        with _instance_lock:
+            if _instance is None:
+                _instance = DatabaseManager()
+    return _instance 
\ No newline at end of file
@@ -6,20 +6,33 @@ Converted from Streamlit to Reflex
 import reflex as rx
 import pandas as pd
 import requests
+import httpx
+import asyncio
 import re
 import logging
-import json
+import orjson
 import time
 import os
+import hashlib
+import tempfile
+import threading
 import numpy as np
-from uuid import uuid4
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from sqlalchemy import create_engine, text
 from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from collections import defaultdict, Counter
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+from database import get_db_manager, get_cache_dir
+from utils import extract_questions
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 # ============= LOGGING SETUP =============
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +52,11 @@ HEADING_LENGTH_THRESHOLD = 50
 MODEL_NAME = "all-MiniLM-L6-v2"
 BATCH_SIZE = 1000
 CACHE_FILE = "survey_cache.json"
+# Embedding and ANN index caches, kept under database.get_cache_dir()
+EMBEDDINGS_CACHE_NAME = "embeddings_cache.npz"
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
 REQUEST_DELAY = 0.5
 MAX_SURVEYS_PER_BATCH = 10
 
@@ -111,17 +129,158 @@ PROGRAMMES = {
     "ALL": ["all programmes", "template", "multilingual"]
 }
 
-# UID Final Reference Data (truncated for brevity)
-UID_FINAL_REFERENCE = {
-    "On a scale of 0-10, how likely is it that you would recommend AMI to someone (a colleague, friend or other business?)": 1,
-    "Do you (in general) feel more confident about your ability to raise capital for your business?": 38,
-    "Have you set and shared your Growth Goal with AMI?": 57,
-    "What is your gender?": 233,
-    "What is your age?": 234,
-    # ... (add more as needed)
-}
+# Categorical dtypes for the AMI taxonomies; "Unknown" is the unmatched label.
+# Filters hold integer codes into these categories rather than label strings.
+_STAGE_CATS = pd.CategoricalDtype(categories=[*SURVEY_STAGES, "Unknown"])
+_RESPONDENT_CATS = pd.CategoricalDtype(categories=[*RESPONDENT_TYPES, "Unknown"])
+_PROGRAMME_CATS = pd.CategoricalDtype(categories=[*PROGRAMMES, "Unknown"])
+
+# UID Final Reference Data, kept in uid_final_reference.json (question -> UID Final)
+UID_FINAL_REFERENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uid_final_reference.json")
+
+@lru_cache(maxsize=1)
+def load_uid_final_reference() -> Dict[str, int]:
+    """Load the UID Final reference mapping from disk once"""
+    with open(UID_FINAL_REFERENCE_FILE, "rb") as f:
+        return orjson.loads(f.read())
+
+UID_FINAL_REFERENCE = load_uid_final_reference()
+
+# Summary figures shown on the dashboards, computed once instead of per render
+_UID_REF_VALUES = UID_FINAL_REFERENCE.values()
+_UID_REF_LEN = len(UID_FINAL_REFERENCE)
+_UID_REF_UNIQUE = len(set(_UID_REF_VALUES))
+_UID_REF_MIN = min(_UID_REF_VALUES) if _UID_REF_VALUES else 0
+_UID_REF_MAX = max(_UID_REF_VALUES) if _UID_REF_VALUES else 0
+_UID_REF_RANGE = f"{_UID_REF_MIN}-{_UID_REF_MAX}"
+
+# ============= HTTP SESSION =============
+
+_SM_SESSION: Optional[requests.Session] = None
+
+def get_sm_session(token: str) -> requests.Session:
+    """Shared keep-alive session for SurveyMonkey, retrying transient errors"""
+    global _SM_SESSION
+    if _SM_SESSION is None:
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_maxsize=20, max_retries=retries))
+        session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
+        })
+        _SM_SESSION = session
+    return _SM_SESSION
+
+def fetch_sm_user(token: str):
+    """Blocking check of the SurveyMonkey token; returns (connected, message)"""
+    try:
+        response = get_sm_session(token).get(
+            "https://api.surveymonkey.com/v3/users/me",
+            timeout=10
+        )
+        
+        if response.status_code == 200:
+            user_data = orjson.loads(response.content)
+            username = user_data.get("username", "Unknown")
+            return True, f"Connected as {username}"
+        else:
+            return False, f"API error: {response.status_code}"
+            
+    except Exception as e:
+        return False, f"Connection failed: {str(e)}"
+
+def fetch_surveys(token: str) -> Optional[List[Dict]]:
+    """Blocking fetch of the survey list; None when the request fails"""
+    try:
+        url = "https://api.surveymonkey.com/v3/surveys"
+        response = get_sm_session(token).get(url, timeout=10)
+        
+        if response.status_code == 200:
+            return orjson.loads(response.content).get("data", [])
+        
+    except Exception as e:
+        logger.error(f"Failed to load surveys: {e}")
+    return None
+
+async def fetch_survey_details(token: str, survey_ids: List[str]) -> List[Optional[Dict]]:
+    """Fetch details for several surveys concurrently, in the order given
+
+    At most MAX_SURVEYS_PER_BATCH requests are in flight at once; requests
+    only back off (from REQUEST_DELAY, doubling) when SurveyMonkey answers 429.
+    """
+    semaphore = asyncio.Semaphore(MAX_SURVEYS_PER_BATCH)
+    
+    async with httpx.AsyncClient(
+        base_url="https://api.surveymonkey.com",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=10.0,
+    ) as client:
+        async def fetch_one(survey_id: str) -> Optional[Dict]:
+            async with semaphore:
+                delay = REQUEST_DELAY
+                for _ in range(3):
+                    try:
+                        response = await client.get(f"/v3/surveys/{survey_id}/details")
+                    except httpx.HTTPError as e:
+                        logger.error(f"Failed to fetch survey {survey_id}: {e}")
+                        return None
+                    if response.status_code != 429:
+                        break
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                
+                if response.status_code != 200:
+                    logger.error(f"Failed to fetch survey {survey_id}: {response.status_code}")
+                    return None
+                return orjson.loads(response.content)
+        
+        return await asyncio.gather(*[fetch_one(survey_id) for survey_id in survey_ids])
+
+# Columns produced by utils.extract_questions, shared with the enhanced app
+QUESTION_COLUMNS = (
+    "survey_id", "survey_title", "question_uid", "heading_0", "position",
+    "is_choice", "parent_question", "question_type", "schema_type",
+    "mandatory", "mandatory_editable",
+)
 
 # ============= STATE MANAGEMENT =============
+
+# Seconds a client may stay idle before its frames are dropped,
+# in line with Reflex's default state expiry
+STORE_TTL = 3600
+
+class _Store:
+    """Process-local DataFrame storage, keyed by client token and frame name
+
+    Reflex serializes state on every event, so AppState keeps its
+    DataFrames here and only tracks has_<name> flags itself. The client
+    token survives reconnects and reloads; clients idle for longer than
+    the TTL are evicted.
+    """
+    
+    def __init__(self, ttl: float = STORE_TTL):
+        self.ttl = ttl
+        self.clients: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self.last_used: Dict[str, float] = {}
+    
+    def frames(self, token: str) -> Dict[str, pd.DataFrame]:
+        """The frames of one client, evicting clients idle past the TTL"""
+        now = time.monotonic()
+        for stale in [t for t, used in self.last_used.items() if now - used > self.ttl]:
+            del self.last_used[stale]
+            self.clients.pop(stale, None)
+        self.last_used[token] = now
+        return self.clients.setdefault(token, {})
+
+STORE = _Store()
+
 class AppState(rx.State):
     """Main application state"""
     
@@ -136,12 +295,13 @@ class AppState(rx.State):
     
     # Data
     surveys: List[Dict] = []
-    df_target: Optional[pd.DataFrame] = None
-    df_final: Optional[pd.DataFrame] = None
-    question_bank: Optional[pd.DataFrame] = None
-    question_bank_with_authority: Optional[pd.DataFrame] = None
-    all_questions: Optional[pd.DataFrame] = None
-    unique_uid_table: Optional[pd.DataFrame] = None
+    # DataFrames live in STORE; state only records which ones are present
+    has_df_target: bool = False
+    has_df_final: bool = False
+    has_question_bank: bool = False
+    has_question_bank_with_authority: bool = False
+    has_all_questions: bool = False
+    has_unique_uid_table: bool = False
     
     # UI state
     selected_surveys: List[str] = []
@@ -149,127 +309,209 @@ class AppState(rx.State):
     show_main_only: bool = True
     loading: bool = False
     
-    # Filters
-    survey_stage_filter: List[str] = list(SURVEY_STAGES.keys())
-    respondent_type_filter: List[str] = list(RESPONDENT_TYPES.keys())
-    programme_filter: List[str] = list(PROGRAMMES.keys())
+    # Filters (category codes, see _STAGE_CATS and friends)
+    survey_stage_filter: List[int] = list(range(len(_STAGE_CATS.categories)))
+    respondent_type_filter: List[int] = list(range(len(_RESPONDENT_CATS.categories)))
+    programme_filter: List[int] = list(range(len(_PROGRAMME_CATS.categories)))
     
     # Metrics
+    question_bank_count: int = 0
     total_questions: int = 0
     main_questions: int = 0
     matched_percentage: float = 0.0
     
+    @rx.var
+    def visible_surveys(self) -> List[Dict[str, str]]:
+        """Loaded surveys whose AMI categories pass the current filters"""
+        if not self.surveys:
+            return []
+        surveys = pd.DataFrame.from_records(self.surveys, columns=["id", "title"])
+        categories = filter_by_ami_codes(
+            categorize_surveys(surveys["title"]),
+            self.survey_stage_filter,
+            self.respondent_type_filter,
+            self.programme_filter,
+        )
+        return surveys.loc[categories.index].to_dict("records")
+    
+    @property
+    def df_target(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("df_target")
+    
+    @property
+    def df_final(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("df_final")
+    
+    @property
+    def question_bank(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("question_bank")
+    
+    @property
+    def question_bank_with_authority(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("question_bank_with_authority")
+    
+    @property
+    def all_questions(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("all_questions")
+    
+    @property
+    def unique_uid_table(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("unique_uid_table")
+    
+    def _get_frame(self, name: str) -> Optional[pd.DataFrame]:
+        """A stored DataFrame, or None; the has_<name> flag is the source of truth"""
+        frames = STORE.frames(self.router.session.client_token)
+        flag = f"has_{name}"
+        df = frames.get(name) if getattr(self, flag) else None
+        if df is None:
+            # Evicted, or left over from an earlier state for this client
+            frames.pop(name, None)
+            if getattr(self, flag):
+                setattr(self, flag, False)
+        return df
+    
+    def _store_frame(self, name: str, df: Optional[pd.DataFrame]):
+        """Store (or drop, when None) a client DataFrame, flag its presence and update its metrics"""
+        frames = STORE.frames(self.router.session.client_token)
+        if df is None:
+            frames.pop(name, None)
+        else:
+            frames[name] = df
+        setattr(self, f"has_{name}", df is not None)
+        
+        if name == "question_bank":
+            self.question_bank_count = 0 if df is None else len(df)
+        elif name == "df_target":
+            self.total_questions = 0 if df is None else len(df)
+            self.main_questions = 0 if df is None or "is_choice" not in df else int((~df["is_choice"].astype(bool)).sum())
+        elif name == "df_final":
+            if df is None or df.empty or "Final_UID" not in df:
+                self.matched_percentage = 0.0
+            else:
+                self.matched_percentage = round(float(df["Final_UID"].notna().mean()) * 100, 1)
+    
     def navigate_to(self, page: str):
         """Navigate to a specific page"""
         self.current_page = page
     
+    @rx.event(background=True)
     async def initialize_app(self):
-        """Initialize the application"""
-        self.loading = True
-        
-        # Check connections
-        await self.check_connections()
-        
-        # Load initial data
-        await self.load_initial_data()
+        """Initialize the application
+
+        Runs as a background task so other events are handled while the
+        blocking SurveyMonkey calls run in worker threads.
+        """
+        async with self:
+            self.loading = True
         
-        self.loading = False
-    
-    async def check_connections(self):
-        """Check SurveyMonkey and Snowflake connections"""
-        try:
-            # Check SurveyMonkey
-            sm_status, sm_msg = await self.check_surveymonkey_connection()
-            self.sm_connected = sm_status
-            self.sm_message = sm_msg
-            
-            # Check Snowflake
-            sf_status, sf_msg = await self.check_snowflake_connection()
-            self.sf_connected = sf_status
-            self.sf_message = sf_msg
-            
-        except Exception as e:
-            logger.error(f"Connection check failed: {e}")
-    
-    async def check_surveymonkey_connection(self):
-        """Check SurveyMonkey API connection"""
+        sm_status = False
         try:
+            # Check connections
             token = self.get_surveymonkey_token()
-            if not token:
-                return False, "No access token available"
-            
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.get(
-                "https://api.surveymonkey.com/v3/users/me", 
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                user_data = response.json()
-                username = user_data.get("username", "Unknown")
-                return True, f"Connected as {username}"
+            if token:
+                sm_status, sm_msg = await asyncio.to_thread(fetch_sm_user, token)
             else:
-                return False, f"API error: {response.status_code}"
-                
+                sm_status, sm_msg = False, "No access token available"
+            sf_status, sf_msg = await self.check_snowflake_connection()
+            async with self:
+                self.sm_connected, self.sm_message = sm_status, sm_msg
+                self.sf_connected, self.sf_message = sf_status, sf_msg
         except Exception as e:
-            return False, f"Connection failed: {str(e)}"
+            logger.error(f"Failed to initialize app: {e}")
+            sm_status = sf_status = False
+        finally:
+            async with self:
+                self.loading = False
+        
+        # Load initial data in their own background tasks; chain the events rather than awaiting them
+        events = []
+        if sm_status:
+            events.append(AppState.load_surveys)
+        if sf_status:
+            events.append(AppState.load_question_bank)
+        return events
     
     async def check_snowflake_connection(self):
         """Check Snowflake connection"""
-        try:
-            # Implementation would depend on your Snowflake setup
-            # For now, return a placeholder
-            return True, "Connected to Snowflake"
-        except Exception as e:
-            return False, f"Connection failed: {str(e)}"
+        return await asyncio.to_thread(get_db_manager().check_snowflake_connection)
     
     def get_surveymonkey_token(self):
         """Get SurveyMonkey token from environment or config"""
         # In Reflex, you'd typically use environment variables
         return os.getenv("SURVEYMONKEY_ACCESS_TOKEN")
     
-    async def load_initial_data(self):
-        """Load initial data"""
-        try:
-            if self.sm_connected:
-                await self.load_surveys()
-            
-            if self.sf_connected:
-                await self.load_question_bank()
-                
-        except Exception as e:
-            logger.error(f"Failed to load initial data: {e}")
-    
+    @rx.event(background=True)
     async def load_surveys(self):
         """Load surveys from SurveyMonkey"""
+        token = self.get_surveymonkey_token()
+        if not token:
+            return
+        
+        surveys = await asyncio.to_thread(fetch_surveys, token)
+        if surveys is not None:
+            async with self:
+                self.surveys = surveys
+    
+    @rx.event(background=True)
+    async def load_survey_questions(self):
+        """Fetch the selected surveys' details and extract their questions"""
+        token = self.get_surveymonkey_token()
+        async with self:
+            survey_ids = list(self.selected_surveys)
+            if not token or not survey_ids:
+                return
+            self.loading = True
+        
         try:
-            token = self.get_surveymonkey_token()
-            if not token:
+            details = await fetch_survey_details(token, survey_ids)
+            rows = [row for survey in details if survey for row in extract_questions(survey)]
+            df_target = pd.DataFrame.from_records(rows, columns=list(QUESTION_COLUMNS))
+            async with self:
+                self._store_frame("df_target", df_target)
+                # Matches made against the previous questions no longer apply
+                self._store_frame("df_final", None)
+        except Exception as e:
+            logger.error(f"Failed to load survey questions: {e}")
+        finally:
+            async with self:
+                self.loading = False
+    
+    @rx.event(background=True)
+    async def run_uid_matching(self):
+        """Match the loaded questions against the question bank"""
+        async with self:
+            df_target, question_bank = self.df_target, self.question_bank
+            if df_target is None or question_bank is None:
                 return
-            
-            url = "https://api.surveymonkey.com/v3/surveys"
-            headers = {"Authorization": f"Bearer {token}"}
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                self.surveys = response.json().get("data", [])
-            
+            self.loading = True
+        
+        try:
+            matches = await asyncio.to_thread(
+                match_questions,
+                df_target["heading_0"],
+                question_bank["HEADING_0"],
+                question_bank["UID"],
+            )
+            df_final = pd.concat([df_target.reset_index(drop=True), matches], axis=1)
+            async with self:
+                self._store_frame("df_final", df_final)
         except Exception as e:
-            logger.error(f"Failed to load surveys: {e}")
+            logger.error(f"UID matching failed: {e}")
+        finally:
+            async with self:
+                self.loading = False
     
+    @rx.event(background=True)
     async def load_question_bank(self):
-        """Load question bank from Snowflake"""
+        """Load question bank from Snowflake into the frame cache"""
         try:
-            # Placeholder for Snowflake query
-            # You'd implement the actual Snowflake connection here
-            pass
+            question_bank = await asyncio.to_thread(get_db_manager().get_all_question_bank)
         except Exception as e:
             logger.error(f"Failed to load question bank: {e}")
+            return
+        
+        async with self:
+            self._store_frame("question_bank", None if question_bank.empty else question_bank)
     
     def update_search_query(self, value: str):
         """Update search query"""
@@ -282,31 +524,442 @@ class AppState(rx.State):
     def update_selected_surveys(self, surveys: List[str]):
         """Update selected surveys"""
         self.selected_surveys = surveys
+    
+    def set_ami_filter(self, field: str, label: str):
+        """Narrow one AMI filter to a single category; the label "All" selects every one"""
+        categories = _AMI_DTYPES[field].categories
+        codes = list(range(len(categories))) if label == "All" else [categories.get_loc(label)]
+        setattr(self, f"{field}_filter", codes)
+    
+    def set_survey_selected(self, survey_id: str, selected: bool):
+        """Add or remove one survey from the selection"""
+        if selected and survey_id not in self.selected_surveys:
+            self.selected_surveys.append(survey_id)
+        elif not selected:
+            self.selected_surveys = [s for s in self.selected_surveys if s != survey_id]
 
 # ============= UTILITY FUNCTIONS =============
 
-def enhanced_normalize(text, synonym_map=ENHANCED_SYNONYM_MAP):
+def _compile_synonym_pattern(synonym_map):
+    """Build one alternation matching any synonym phrase, longest first"""
+    phrases = sorted(synonym_map, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, phrases)))
+
+_SYNONYM_RE = _compile_synonym_pattern(ENHANCED_SYNONYM_MAP)
+_PUNCT_RE = re.compile(r'[^\w\s]+')
+_STOP = frozenset(ENGLISH_STOP_WORDS)
+
+def enhanced_normalize(text, synonym_map=ENHANCED_SYNONYM_MAP, _stop=_STOP):
     """Enhanced text normalization with synonym mapping"""
     if not isinstance(text, str):
         return ""
     try:
         text = text.lower().strip()
-        # Apply synonym mapping
-        for phrase, replacement in synonym_map.items():
-            text = text.replace(phrase, replacement)
+        # Apply synonym mapping in a single pass
+        if synonym_map:
+            if synonym_map is ENHANCED_SYNONYM_MAP:
+                synonym_re = _SYNONYM_RE
+            else:
+                synonym_re = _compile_synonym_pattern(synonym_map)
+            text = synonym_re.sub(lambda m: synonym_map[m.group(0)], text)
         
-        # Remove punctuation and normalize spaces
-        text = re.sub(r'[^\w\s]', '', text)
-        text = re.sub(r'\s+', ' ', text)
+        # Remove punctuation; split() below also collapses whitespace
+        text = _PUNCT_RE.sub('', text)
         
         # Remove stop words
         words = text.split()
-        words = [w for w in words if w not in ENGLISH_STOP_WORDS and len(w) > 2]
+        words = [w for w in words if len(w) > 2 and w not in _stop]
         return ' '.join(words)
     except Exception as e:
         logger.error(f"Error normalizing text: {e}")
         return ""
 
+def normalize_batch(texts, synonym_map=ENHANCED_SYNONYM_MAP, _stop=_STOP) -> List[str]:
+    """enhanced_normalize over many texts in one fused loop
+
+    Every step runs per string inside a single pass, with the regex and
+    stopword lookups bound as locals, instead of materializing an
+    intermediate Series per step.
+    """
+    if synonym_map is ENHANCED_SYNONYM_MAP:
+        synonym_re = _SYNONYM_RE
+    else:
+        synonym_re = _compile_synonym_pattern(synonym_map) if synonym_map else None
+    synonym_sub = synonym_re.sub if synonym_re is not None else None
+    punct_sub = _PUNCT_RE.sub
+    replace = lambda m: synonym_map[m.group(0)]
+    out = []
+    append = out.append
+    for text in texts:
+        if not isinstance(text, str):
+            append("")
+            continue
+        text = text.lower()
+        if synonym_sub is not None:
+            text = synonym_sub(replace, text)
+        text = punct_sub('', text)
+        append(' '.join([w for w in text.split() if len(w) > 2 and w not in _stop]))
+    return out
+
+def enhanced_normalize_series(texts: pd.Series) -> pd.Series:
+    """enhanced_normalize over a Series of question texts, via normalize_batch"""
+    return pd.Series(normalize_batch(texts.tolist()), index=texts.index, dtype=object)
+
+_MODEL = None
+
+def get_model():
+    """Load the sentence-transformer model once and reuse it"""
+    global _MODEL
+    if _MODEL is None:
+        import torch
+        torch.set_num_threads(min(8, os.cpu_count() or 4))
+        model = SentenceTransformer(MODEL_NAME)
+        if torch.cuda.is_available():
+            # Half precision roughly doubles GPU encode throughput
+            model = model.half().to('cuda')
+        _MODEL = model
+    return _MODEL
+
+def embed_questions(texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """Encode texts into l2-normalized embeddings, batching by similar length
+
+    Repeated texts (identity questions, NPS, ...) are encoded only once.
+    """
+    if not texts:
+        return np.zeros((0, get_model().get_sentence_embedding_dimension()), dtype=np.float32)
+    
+    unique_texts, inverse = np.unique(np.asarray(texts, dtype=object), return_inverse=True)
+    
+    # Sorting by length keeps padding within each mini-batch small
+    order = np.argsort([len(t) for t in unique_texts], kind='stable')
+    embeddings = get_model().encode(
+        unique_texts[order].tolist(),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    
+    # Undo the length sort, then scatter back to every original position
+    unique_embeddings = np.empty_like(embeddings)
+    unique_embeddings[order] = embeddings
+    return unique_embeddings[inverse.ravel()]
+
+_EMBEDDING_CACHE: Optional[Dict[str, np.ndarray]] = None
+# Matching runs in worker threads for many sessions at once; guards loading,
+# updating and saving _EMBEDDING_CACHE
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+def _embedding_key(text: str) -> str:
+    """Content-addressed cache key for one text under the current model"""
+    return hashlib.blake2b(f"{MODEL_NAME}|{text}".encode(), digest_size=16).hexdigest()
+
+def _load_embedding_cache() -> Dict[str, np.ndarray]:
+    """Load persisted embeddings once per process; call with _EMBEDDING_CACHE_LOCK held"""
+    global _EMBEDDING_CACHE
+    if _EMBEDDING_CACHE is None:
+        try:
+            with np.load(get_cache_dir() / EMBEDDINGS_CACHE_NAME) as data:
+                _EMBEDDING_CACHE = dict(zip(data["keys"].tolist(), data["embeddings"]))
+        except FileNotFoundError:
+            _EMBEDDING_CACHE = {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embeddings cache: {e}")
+            _EMBEDDING_CACHE = {}
+    return _EMBEDDING_CACHE
+
+def _save_embedding_cache(cache: Dict[str, np.ndarray]):
+    """Atomically rewrite the embeddings cache file; call with _EMBEDDING_CACHE_LOCK held"""
+    path = get_cache_dir() / EMBEDDINGS_CACHE_NAME
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp file, so another process writing the cache cannot interleave
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp",
+                                         delete=False) as f:
+            tmp_path = f.name
+            np.savez(f, keys=np.array(list(cache)), embeddings=np.stack(list(cache.values())))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Failed to write embeddings cache: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def cached_embed(texts: List[str]) -> np.ndarray:
+    """Embed texts as float16, only encoding texts not seen in earlier runs"""
+    if not texts:
+        return np.zeros((0, get_model().get_sentence_embedding_dimension()), dtype=np.float16)
+    
+    keys = [_embedding_key(t) for t in texts]
+    with _EMBEDDING_CACHE_LOCK:
+        cache = _load_embedding_cache()
+        missing = {k: t for k, t in zip(keys, texts) if k not in cache}
+    
+    # Encode outside the lock so concurrent runs only wait on the cache itself
+    if missing:
+        new_embeddings = embed_questions(list(missing.values())).astype(np.float16)
+    
+    with _EMBEDDING_CACHE_LOCK:
+        if missing:
+            cache.update(zip(missing, new_embeddings))
+            _save_embedding_cache(cache)
+        return np.stack([cache[k] for k in keys])
+
+def compute_tfidf_matches(target_texts: List[str], bank_texts: List[str]):
+    """Find the most similar bank question for each target question by TF-IDF cosine
+
+    Returns (best_index, best_score) arrays with one entry per target text.
+    """
+    # l2-normalized rows make cosine similarity a plain sparse matmul
+    vectorizer = TfidfVectorizer(norm='l2', sublinear_tf=True, dtype=np.float32)
+    bank_matrix = vectorizer.fit_transform(bank_texts)
+    target_matrix = vectorizer.transform(target_texts)
+    
+    indices, scores = topk_sparse_cosine(target_matrix, bank_matrix, k=1)
+    return indices[:, 0], scores[:, 0]
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Row-wise l2-normalize as float32, with one einsum pass for the norms"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+    norms[norms == 0] = 1.0
+    return matrix / norms[:, None]
+
+def compute_semantic_matches(target_embeddings: np.ndarray, bank_embeddings: np.ndarray,
+                             block: int = BATCH_SIZE):
+    """Find the most similar bank question for each target by embedding cosine
+
+    Inputs are l2-normalized embeddings (as produced by embed_questions) and
+    rows are renormalized once after upcasting, so cosine similarity is a
+    plain dot product. The bank may be float16 (as produced by cached_embed);
+    it is upcast one block of rows at a time so it stays compact in memory.
+    There is deliberately no int8 bank: numpy's integer matmul bypasses BLAS
+    and runs about 20x slower than float32, which outweighs the halved
+    storage. Returns (best_index, best_score).
+    """
+    n_targets, n_bank = len(target_embeddings), len(bank_embeddings)
+    best_index = np.zeros(n_targets, dtype=np.int64)
+    best_score = np.full(n_targets, -np.inf if n_bank else 0.0, dtype=np.float32)
+    if n_targets == 0 or n_bank == 0:
+        return best_index, best_score
+    
+    target = _l2_normalize(target_embeddings)
+    rows = np.arange(n_targets)
+    for start in range(0, n_bank, block):
+        # Renormalize after upcasting so float16 rounding does not skew cosines
+        sims = target @ _l2_normalize(bank_embeddings[start:start + block]).T
+        chunk_index = sims.argmax(axis=1)
+        chunk_score = sims[rows, chunk_index]
+        better = chunk_score > best_score
+        best_index[better] = chunk_index[better] + start
+        best_score[better] = chunk_score[better]
+    return best_index, best_score
+
+_BANK_INDEX: Optional[tuple] = None
+
+def get_bank_index(bank_embeddings: np.ndarray, bank_texts: List[str]):
+    """HNSW inner-product index over the bank embeddings, or None without faiss
+
+    The index is kept in memory and persisted in the cache dir, keyed by a
+    hash of the bank texts so a changed question bank gets a fresh index;
+    index files for earlier banks are removed when a new one is written.
+    """
+    global _BANK_INDEX
+    if faiss is None or len(bank_embeddings) == 0:
+        return None
+    
+    key = hashlib.blake2b(f"{MODEL_NAME}|{len(bank_texts)}|".encode(), digest_size=16)
+    for text in bank_texts:
+        key.update(text.encode())
+        key.update(b"\0")
+    key = key.hexdigest()
+    if _BANK_INDEX is not None and _BANK_INDEX[0] == key:
+        return _BANK_INDEX[1]
+    
+    cache_dir = get_cache_dir()
+    index_file = cache_dir / f"bank_{key}.faiss"
+    try:
+        index = faiss.read_index(str(index_file))
+    except Exception:
+        index = faiss.IndexHNSWFlat(bank_embeddings.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.add(_l2_normalize(bank_embeddings))
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(index, str(index_file))
+            for stale in cache_dir.glob("bank_*.faiss"):
+                if stale != index_file:
+                    stale.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Failed to write bank index: {e}")
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    _BANK_INDEX = (key, index)
+    return index
+
+def search_semantic_matches(target_embeddings: np.ndarray, bank_embeddings: np.ndarray, bank_texts: List[str]):
+    """Best bank match per target via the faiss index, falling back to exact search
+
+    Targets the index finds no neighbour for get index 0 with score 0.
+    """
+    index = get_bank_index(bank_embeddings, bank_texts)
+    if index is None or len(target_embeddings) == 0:
+        return compute_semantic_matches(target_embeddings, bank_embeddings)
+    
+    scores, indices = index.search(_l2_normalize(target_embeddings), 1)
+    best_index, best_score = indices[:, 0].astype(np.int64), scores[:, 0]
+    # HNSW reports -1 when it finds no neighbour; -1 must not reach .iloc
+    no_match = best_index < 0
+    best_index[no_match] = 0
+    best_score[no_match] = 0.0
+    return best_index, best_score
+
+def topk_sparse_cosine(target_matrix, bank_matrix, k: int = 5, block: int = BATCH_SIZE):
+    """Top-k bank matches per target row of two l2-normalized sparse matrices
+
+    Similarities are computed one block of target rows at a time, so peak
+    memory is O(block * n_bank) rather than O(n_target * n_bank).
+    Returns (indices, scores) arrays of shape (n_target, k), best first.
+    """
+    n_targets = target_matrix.shape[0]
+    k = min(k, bank_matrix.shape[0])
+    indices = np.zeros((n_targets, k), dtype=np.int64)
+    scores = np.zeros((n_targets, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+    
+    bank_t = bank_matrix.T.tocsr()
+    for start in range(0, n_targets, block):
+        sims = (target_matrix[start:start + block] @ bank_t).toarray()
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices[start:start + block] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + block] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+def match_questions(target_texts: pd.Series, bank_texts: pd.Series, bank_uids: pd.Series) -> pd.DataFrame:
+    """Assign a bank UID to each target question, TF-IDF first, semantic only when unsure
+
+    Questions scoring at least TFIDF_HIGH_CONFIDENCE keep their TF-IDF match
+    and those below TFIDF_LOW_CONFIDENCE are left unmatched; only the band
+    in between is embedded and re-scored semantically.
+    """
+    target_texts = target_texts.fillna("").astype(str).reset_index(drop=True)
+    bank_texts = bank_texts.fillna("").astype(str).reset_index(drop=True)
+    bank_uids = bank_uids.reset_index(drop=True)
+    
+    result = pd.DataFrame({
+        "Match_Confidence": pd.Series([None] * len(target_texts), dtype=object),
+        "Final_UID": pd.Series([None] * len(target_texts), dtype=object),
+        "Similarity": np.zeros(len(target_texts), dtype=np.float32),
+    })
+    if target_texts.empty or bank_texts.empty:
+        return result
+    
+    tfidf_index, tfidf_score = compute_tfidf_matches(
+        enhanced_normalize_series(target_texts).tolist(),
+        enhanced_normalize_series(bank_texts).tolist(),
+    )
+    result["Final_UID"] = bank_uids.iloc[tfidf_index].to_numpy(dtype=object)
+    result["Similarity"] = tfidf_score
+    
+    high = tfidf_score >= TFIDF_HIGH_CONFIDENCE
+    unsure = ~high & (tfidf_score >= TFIDF_LOW_CONFIDENCE)
+    result.loc[high, "Match_Confidence"] = "✅ High"
+    result.loc[unsure, "Match_Confidence"] = "⚠️ Low"
+    result.loc[~high & ~unsure, "Final_UID"] = None
+    
+    if unsure.any():
+        unsure_rows = np.flatnonzero(unsure)
+        bank_list = bank_texts.tolist()
+        # Only the bank is worth persisting; survey text changes from run to
+        # run and would make every run rewrite the whole cache file
+        semantic_index, semantic_score = search_semantic_matches(
+            embed_questions(target_texts.iloc[unsure_rows].tolist()),
+            cached_embed(bank_list),
+            bank_list,
+        )
+        semantic = semantic_score >= SEMANTIC_THRESHOLD
+        rows = unsure_rows[semantic]
+        result.loc[rows, "Match_Confidence"] = "🧠 Semantic"
+        result.loc[rows, "Final_UID"] = bank_uids.iloc[semantic_index[semantic]].to_numpy(dtype=object)
+        result.loc[rows, "Similarity"] = semantic_score[semantic]
+    
+    return result
+
+# Every AMI keyword in one pattern; the lookahead reports the longest
+# keyword starting at each position in a single scan of the title.
+_AMI_TAXONOMIES = (
+    ("survey_stage", SURVEY_STAGES),
+    ("respondent_type", RESPONDENT_TYPES),
+    ("programme", PROGRAMMES),
+)
+_AMI_KEYWORD_LABELS = defaultdict(list)
+for _field, _categories in _AMI_TAXONOMIES:
+    for _label, _keywords in _categories.items():
+        for _keyword in _keywords:
+            _AMI_KEYWORD_LABELS[_keyword].append((_field, _label))
+_AMI_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_AMI_KEYWORD_LABELS, key=len, reverse=True))) + "))"
+)
+# Any other keyword matching at the same position is a prefix of the longest
+# one, so each keyword also carries the labels of its keyword prefixes.
+_AMI_KEYWORD_HITS = {
+    keyword: frozenset(
+        payload
+        for prefix, payloads in _AMI_KEYWORD_LABELS.items()
+        if keyword.startswith(prefix)
+        for payload in payloads
+    )
+    for keyword in _AMI_KEYWORD_LABELS
+}
+_AMI_LABEL_RANK = {
+    (field, label): rank
+    for field, categories in _AMI_TAXONOMIES
+    for rank, label in enumerate(categories)
+}
+
+def categorize_survey_by_ami_structure(title) -> Dict[str, str]:
+    """Classify a survey title into AMI survey stage, respondent type and programme
+
+    When several categories match, the one listed first in its taxonomy wins.
+    """
+    if not isinstance(title, str):
+        title = ""
+    hits = {
+        payload
+        for match in _AMI_KEYWORD_RE.finditer(title.lower())
+        for payload in _AMI_KEYWORD_HITS[match.group(1)]
+    }
+    
+    result = {}
+    for field, _ in _AMI_TAXONOMIES:
+        labels = [(_AMI_LABEL_RANK[hit], hit[1]) for hit in hits if hit[0] == field]
+        result[field] = min(labels)[1] if labels else "Unknown"
+    return result
+
+_AMI_DTYPES = {
+    "survey_stage": _STAGE_CATS,
+    "respondent_type": _RESPONDENT_CATS,
+    "programme": _PROGRAMME_CATS,
+}
+
+def categorize_surveys(titles: pd.Series) -> pd.DataFrame:
+    """Categorize survey titles into categorical AMI structure columns"""
+    records = [categorize_survey_by_ami_structure(title) for title in titles]
+    df = pd.DataFrame.from_records(records, index=titles.index, columns=list(_AMI_DTYPES))
+    return df.astype(_AMI_DTYPES)
+
+def filter_by_ami_codes(df: pd.DataFrame, survey_stage_codes: List[int],
+                        respondent_type_codes: List[int], programme_codes: List[int]) -> pd.DataFrame:
+    """Keep rows whose categorical AMI columns fall within the selected codes"""
+    mask = (
+        df["survey_stage"].cat.codes.isin(survey_stage_codes)
+        & df["respondent_type"].cat.codes.isin(respondent_type_codes)
+        & df["programme"].cat.codes.isin(programme_codes)
+    )
+    return df[mask]
+
 # ============= COMPONENTS =============
 
 def metric_card(title: str, value: str, description: str = ""):
@@ -413,7 +1066,7 @@ def home_page():
         rx.hstack(
             metric_card("🔄 Status", "Active"),
             metric_card("📊 SM Surveys", rx.text(AppState.surveys.length())),
-            metric_card("🎯 UID Final Refs", str(len(UID_FINAL_REFERENCE))),
+            metric_card("🎯 UID Final Refs", str(_UID_REF_LEN)),
             spacing="4",
         ),
         
@@ -424,7 +1077,7 @@ def home_page():
             rx.vstack(
                 rx.heading("🎯 UID Final Reference", size="5"),
                 rx.text("New Feature: UID Final reference mapping loaded from provided file"),
-                rx.text(f"• {len(UID_FINAL_REFERENCE)} questions mapped to UID Final values"),
+                rx.text(f"• {_UID_REF_LEN} questions mapped to UID Final values"),
                 rx.text("• Used in Question Bank viewer for enhanced reference"),
                 rx.text("• Provides authoritative UID assignments"),
                 spacing="2",
@@ -493,6 +1146,22 @@ def home_page():
         padding="6",
     )
 
+def ami_filter_select(field: str):
+    """Select narrowing the survey list to one category of an AMI taxonomy"""
+    return rx.select(
+        ["All", *_AMI_DTYPES[field].categories],
+        default_value="All",
+        on_change=lambda label: AppState.set_ami_filter(field, label),
+    )
+
+def survey_checkbox(survey: Dict):
+    """Checkbox selecting one survey for question extraction"""
+    return rx.checkbox(
+        survey["title"],
+        checked=AppState.selected_surveys.contains(survey["id"]),
+        on_change=lambda checked: AppState.set_survey_selected(survey["id"], checked),
+    )
+
 def survey_selection_page():
     """Survey selection page"""
     return rx.vstack(
@@ -508,8 +1177,29 @@ def survey_selection_page():
             ),
             rx.vstack(
                 rx.heading("🔍 Select Surveys", size="4"),
-                # Survey multiselect would go here
-                rx.text("Survey selection component would be implemented here"),
+                rx.hstack(
+                    ami_filter_select("survey_stage"),
+                    ami_filter_select("respondent_type"),
+                    ami_filter_select("programme"),
+                    spacing="4",
+                ),
+                rx.foreach(AppState.visible_surveys, survey_checkbox),
+                rx.button(
+                    "📥 Load Questions",
+                    on_click=AppState.load_survey_questions,
+                    disabled=AppState.loading | (AppState.selected_surveys.length() == 0),
+                ),
+                rx.button(
+                    "🔧 Run UID Matching",
+                    on_click=AppState.run_uid_matching,
+                    disabled=AppState.loading | (AppState.total_questions == 0) | (AppState.question_bank_count == 0),
+                ),
+                rx.hstack(
+                    metric_card("❓ Questions", rx.text(AppState.total_questions)),
+                    metric_card("📝 Main Questions", rx.text(AppState.main_questions)),
+                    metric_card("🎯 Matched", rx.text(AppState.matched_percentage, "%")),
+                    spacing="4",
+                ),
                 spacing="4",
             )
         ),
@@ -528,7 +1218,7 @@ def question_bank_page():
         rx.card(
             rx.vstack(
                 rx.heading("🎯 UID Final Reference (Cached)", size="4"),
-                rx.text(f"Loaded {len(UID_FINAL_REFERENCE)} authoritative question-to-UID Final mappings from cached reference"),
+                rx.text(f"Loaded {_UID_REF_LEN} authoritative question-to-UID Final mappings from cached reference"),
                 rx.text("This is the master reference for UID Final assignments, independent of Snowflake connection."),
                 spacing="2",
             ),
@@ -538,9 +1228,10 @@ def question_bank_page():
         
         # Metrics
         rx.hstack(
-            metric_card("📊 Total UID Final Records", str(len(UID_FINAL_REFERENCE))),
-            metric_card("🎯 Unique UID Finals", str(len(set(UID_FINAL_REFERENCE.values())))),
-            metric_card("📈 UID Final Range", f"{min(UID_FINAL_REFERENCE.values())}-{max(UID_FINAL_REFERENCE.values())}"),
+            metric_card("📊 Total UID Final Records", str(_UID_REF_LEN)),
+            metric_card("🎯 Unique UID Finals", str(_UID_REF_UNIQUE)),
+            metric_card("📈 UID Final Range", _UID_REF_RANGE),
+            metric_card("❄️ Snowflake Questions", rx.text(AppState.question_bank_count)),
             spacing="4",
         ),
         
@@ -584,7 +1275,7 @@ app = rx.App(
     }
 )
 
-app.add_page(index, route="/")
+app.add_page(index, route="/", on_load=AppState.initialize_app)
 
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file
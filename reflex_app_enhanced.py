@@ -5,9 +5,19 @@ Complete implementation with all pages and advanced features
 
 import reflex as rx
 import pandas as pd
+import numpy as np
 import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional, Tuple
-from database import db_manager
+from database import get_db_manager, QB_PARTITIONS
 from utils import (
     enhanced_normalize, categorize_survey_by_ami_structure, 
     extract_questions, run_uid_match, prepare_export_data,
@@ -16,14 +26,124 @@ from utils import (
     PROGRAMMES, UID_FINAL_REFERENCE
 )
 
+# Memoized across categorize passes; the returned dicts are shared, so
+# callers must treat them as read-only.
+_cat_cache = lru_cache(maxsize=4096)(categorize_survey_by_ami_structure)
+
+# UID Final reference summary, computed once at import instead of per render
+_UFR_VALUES = tuple(UID_FINAL_REFERENCE.values())
+_UFR_LEN = len(UID_FINAL_REFERENCE)
+_UFR_UNIQUE = len(set(_UFR_VALUES))
+_UFR_MIN = min(_UFR_VALUES) if _UFR_VALUES else 0
+_UFR_MAX = max(_UFR_VALUES) if _UFR_VALUES else 0
+
+# Repeated string columns are stored as pandas categoricals. Any groupby on
+# them must pass observed=True, or pandas expands every unused category.
+TARGET_CATEGORY_COLUMNS = ("survey_title", "survey_id", "question_type")
+AMI_CATEGORY_COLUMNS = ("survey_stage", "respondent_type", "programme")
+
+def as_categorical(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Cast the given columns (those present) to category dtype in place"""
+    for column in columns:
+        if column in df:
+            df[column] = df[column].astype("category")
+    return df
+
+def _shrink(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Downcast int64/float64 columns to the smallest dtype that holds them"""
+    if df is None:
+        return df
+    # Shallow copy: cached frames from the database layer are left untouched
+    df = df.copy(deep=False)
+    for column in df.select_dtypes(include="int64"):
+        df[column] = pd.to_numeric(df[column], downcast="integer")
+    for column in df.select_dtypes(include="float64"):
+        df[column] = pd.to_numeric(df[column], downcast="float")
+    return df
+
+# Columns produced by extract_questions, in display order
+QUESTION_COLUMNS = (
+    "survey_id", "survey_title", "question_uid", "heading_0", "position",
+    "is_choice", "parent_question", "question_type", "schema_type",
+    "mandatory", "mandatory_editable",
+)
+
+# Columns run_uid_match adds that the metrics read
+MATCH_OUTPUT_COLUMNS = ("Match_Confidence", "Final_UID")
+
+def questions_to_frame(questions: List[Dict]) -> pd.DataFrame:
+    """Build df_target from extracted question records, one column at a time"""
+    keys = set().union(*questions)
+    columns = [c for c in QUESTION_COLUMNS if c in keys]
+    columns += sorted(keys.difference(QUESTION_COLUMNS))
+    
+    # Transposing once into column lists avoids pandas' per-row dict path
+    data = {}
+    for column in columns:
+        if column == "is_choice":
+            data[column] = np.fromiter(
+                (bool(q.get(column)) for q in questions), dtype=bool, count=len(questions)
+            )
+        else:
+            data[column] = [q.get(column) for q in questions]
+    return as_categorical(pd.DataFrame(data, columns=columns), TARGET_CATEGORY_COLUMNS)
+
+# Forking the running server (worker threads, open Snowflake connections)
+# can deadlock the children, so workers start from a clean forkserver.
+_CPU_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+@lru_cache(maxsize=1)
+def get_cpu_pool() -> ProcessPoolExecutor:
+    """Worker processes for CPU-bound matching/export work, created on first use"""
+    return ProcessPoolExecutor(
+        max_workers=max(1, (os.cpu_count() or 2) - 1),
+        mp_context=multiprocessing.get_context(_CPU_POOL_START_METHOD),
+    )
+
+@asynccontextmanager
+async def cpu_pool_lifespan():
+    """Shut the worker pool down when the app stops, if it was ever started"""
+    try:
+        yield
+    finally:
+        if get_cpu_pool.cache_info().currsize:
+            get_cpu_pool().shutdown(wait=False, cancel_futures=True)
+            get_cpu_pool.cache_clear()
+
+# Seconds a client may stay idle before its frames are dropped,
+# in line with Reflex's default state expiry
+STORE_TTL = 3600
+
+class _Store:
+    """Process-local DataFrame storage, keyed by client token and frame name
+
+    Reflex serializes state on every event, so AppState keeps its
+    DataFrames here and only tracks has_<name> flags itself. The client
+    token survives reconnects and reloads; clients idle for longer than
+    the TTL are evicted.
+    """
+    
+    def __init__(self, ttl: float = STORE_TTL):
+        self.ttl = ttl
+        self.clients: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self.last_used: Dict[str, float] = {}
+    
+    def frames(self, token: str) -> Dict[str, pd.DataFrame]:
+        """The frames of one client, evicting clients idle past the TTL"""
+        now = time.monotonic()
+        for stale in [t for t, used in self.last_used.items() if now - used > self.ttl]:
+            del self.last_used[stale]
+            self.clients.pop(stale, None)
+        self.last_used[token] = now
+        return self.clients.setdefault(token, {})
+
+STORE = _Store()
+
 # ============= STATE MANAGEMENT =============
 
 class AppState(rx.State):
     """Enhanced application state with comprehensive data management"""
     
-    # Navigation
-    current_page: str = "home"
-    
     # Connection status
     sm_connected: bool = False
     sf_connected: bool = False
@@ -32,14 +152,16 @@ class AppState(rx.State):
     
     # Data
     surveys: List[Dict] = []
-    df_target: Optional[pd.DataFrame] = None
-    df_final: Optional[pd.DataFrame] = None
-    question_bank: Optional[pd.DataFrame] = None
-    all_questions: Optional[pd.DataFrame] = None
-    categorized_questions: Optional[pd.DataFrame] = None
+    # DataFrames live in STORE; state only records which ones are present
+    has_df_target: bool = False
+    has_df_final: bool = False
+    has_question_bank: bool = False
+    has_all_questions: bool = False
+    has_categorized_questions: bool = False
     
     # UI state
     selected_surveys: List[str] = []
+    selected_survey_ids: List[str] = []
     search_query: str = ""
     show_main_only: bool = True
     loading: bool = False
@@ -61,15 +183,87 @@ class AppState(rx.State):
     no_matches: int = 0
     
     # Export data
-    export_non_identity: Optional[pd.DataFrame] = None
-    export_identity: Optional[pd.DataFrame] = None
+    has_export_non_identity: bool = False
+    has_export_identity: bool = False
+    
+    # Backend-only: set once initialize_app has completed
+    _initialized: bool = False
+    
+    @rx.var
+    def surveys_count(self) -> int:
+        """Number of loaded surveys"""
+        return len(self.surveys)
+    
+    @rx.var
+    def export_ready(self) -> bool:
+        """Whether prepare_export has produced any export data"""
+        return self.has_export_non_identity or self.has_export_identity
+    
+    def _get_frame(self, name: str) -> Optional[pd.DataFrame]:
+        """A stored DataFrame, or None; the has_<name> flag is the source of truth"""
+        frames = STORE.frames(self.router.session.client_token)
+        flag = f"has_{name}"
+        df = frames.get(name) if getattr(self, flag) else None
+        if df is None:
+            # Evicted, or left over from an earlier state for this client
+            frames.pop(name, None)
+            if getattr(self, flag):
+                setattr(self, flag, False)
+        return df
+    
+    def _set_frame(self, name: str, df: Optional[pd.DataFrame]):
+        """Store (or drop, when None) a client DataFrame and flag its presence"""
+        frames = STORE.frames(self.router.session.client_token)
+        if df is None:
+            frames.pop(name, None)
+        else:
+            frames[name] = df
+        setattr(self, f"has_{name}", df is not None)
     
-    async def initialize_app(self):
-        """Initialize the application with all necessary data"""
+    @property
+    def df_target(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("df_target")
+    
+    @property
+    def df_final(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("df_final")
+    
+    @property
+    def question_bank(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("question_bank")
+    
+    @property
+    def all_questions(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("all_questions")
+    
+    @property
+    def categorized_questions(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("categorized_questions")
+    
+    @property
+    def export_non_identity(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("export_non_identity")
+    
+    @property
+    def export_identity(self) -> Optional[pd.DataFrame]:
+        return self._get_frame("export_identity")
+    
+    async def initialize_app(self, force: bool = False):
+        """Initialize the application with all necessary data
+
+        Repeat calls are no-ops once initialized unless force is set, which
+        also drops the cached question bank.
+        """
+        if self._initialized and not force:
+            return
+        
         self.loading = True
         self.status_message = "Initializing application..."
         
         try:
+            if force:
+                await asyncio.to_thread(get_db_manager().refresh_question_bank)
+            
             # Check connections
             self.status_message = "Checking connections..."
             await self.check_connections()
@@ -79,57 +273,70 @@ class AppState(rx.State):
             await self.load_initial_data()
             
             self.status_message = "Ready"
+            self._initialized = True
         except Exception as e:
             self.status_message = f"Initialization failed: {str(e)}"
         finally:
             self.loading = False
     
+    async def refresh_app(self):
+        """Re-initialize, dropping the cached question bank first"""
+        await self.initialize_app(True)
+    
     async def check_connections(self):
         """Check all external connections"""
-        # Check SurveyMonkey
-        self.sm_connected, self.sm_message = db_manager.check_surveymonkey_connection()
-        
-        # Check Snowflake
-        self.sf_connected, self.sf_message = db_manager.check_snowflake_connection()
+        db = get_db_manager()
+        (self.sm_connected, self.sm_message), (self.sf_connected, self.sf_message) = await asyncio.gather(
+            asyncio.to_thread(db.check_surveymonkey_connection),
+            asyncio.to_thread(db.check_snowflake_connection),
+        )
     
     async def load_initial_data(self):
         """Load initial data from external sources"""
         if self.sm_connected:
-            self.surveys = db_manager.get_surveys()
+            self.surveys = await asyncio.to_thread(get_db_manager().get_surveys)
         
         if self.sf_connected:
-            self.question_bank = db_manager.get_question_bank()
-    
-    def navigate_to(self, page: str):
-        """Navigate to a specific page"""
-        self.current_page = page
+            # Fetch disjoint partitions concurrently, one per pooled connection;
+            # a failed partition raises and fails the whole load
+            db = get_db_manager()
+            parts = await asyncio.gather(*[
+                asyncio.to_thread(db.get_question_bank_partition, part, QB_PARTITIONS)
+                for part in range(QB_PARTITIONS)
+            ])
+            question_bank = pd.concat(parts, ignore_index=True)
+            # Per-partition categoricals differ, so concat falls back to object
+            self._set_frame("question_bank", _shrink(as_categorical(question_bank, ("UID",))))
     
     async def load_survey_questions(self):
         """Load questions from selected surveys"""
-        if not self.selected_surveys:
+        if not self.selected_survey_ids:
             return
         
         self.loading = True
-        combined_questions = []
+        survey_ids = self.selected_survey_ids
+        results: List[List[Dict]] = [[] for _ in survey_ids]
+        # Caps concurrent SurveyMonkey requests instead of sleeping between them
+        semaphore = asyncio.Semaphore(8)
+        
+        async def fetch_one(index: int, survey_id: str):
+            async with semaphore:
+                survey_details = await asyncio.to_thread(get_db_manager().get_survey_details_cached, survey_id)
+            return index, extract_questions(survey_details) if survey_details else []
         
         try:
-            for i, survey_id_title in enumerate(self.selected_surveys):
-                survey_id = survey_id_title.split(" - ")[0]
-                self.status_message = f"Loading survey {i+1}/{len(self.selected_surveys)}"
-                self.progress = int((i / len(self.selected_surveys)) * 100)
-                
-                survey_details = db_manager.get_survey_details(survey_id)
-                if survey_details:
-                    questions = extract_questions(survey_details)
-                    combined_questions.extend(questions)
-                
-                # Small delay to prevent rate limiting
-                await asyncio.sleep(0.1)
+            tasks = [fetch_one(i, survey_id) for i, survey_id in enumerate(survey_ids)]
+            for done, future in enumerate(asyncio.as_completed(tasks), start=1):
+                index, questions = await future
+                results[index] = questions
+                self.status_message = f"Loaded survey {done}/{len(survey_ids)}"
+                self.progress = int((done / len(survey_ids)) * 100)
             
+            combined_questions = list(itertools.chain.from_iterable(results))
             if combined_questions:
-                self.df_target = pd.DataFrame(combined_questions)
+                self._set_frame("df_target", questions_to_frame(combined_questions))
                 self.total_questions = len(self.df_target)
-                self.main_questions = len(self.df_target[self.df_target["is_choice"] == False])
+                self.main_questions = int((~self.df_target["is_choice"].astype(bool)).sum())
                 self.status_message = f"Loaded {len(combined_questions)} questions"
             
         except Exception as e:
@@ -147,12 +354,21 @@ class AppState(rx.State):
         self.status_message = "Categorizing surveys..."
         
         try:
-            # Apply AMI categorization
-            categorization_data = self.df_target['survey_title'].apply(categorize_survey_by_ami_structure)
-            categorization_df = pd.DataFrame(categorization_data.tolist())
+            # Apply AMI categorization once per distinct survey title
+            titles = self.df_target['survey_title']
+            cache = {title: _cat_cache(title) for title in titles.unique()}
+            categorization_df = pd.DataFrame.from_records(
+                [cache[title] for title in titles],
+                index=self.df_target.index,
+                columns=AMI_CATEGORY_COLUMNS,
+            ).astype("category")
             
-            # Combine with original data
-            self.categorized_questions = pd.concat([self.df_target, categorization_df], axis=1)
+            # Combine with original data; under Copy-on-Write assign shares
+            # df_target's column buffers instead of copying them
+            categorized = self.df_target.assign(
+                **{column: categorization_df[column] for column in categorization_df.columns}
+            )
+            self._set_frame("categorized_questions", categorized)
             self.status_message = "Categorization complete"
             
         except Exception as e:
@@ -169,13 +385,21 @@ class AppState(rx.State):
         self.status_message = "Running UID matching..."
         
         try:
-            self.df_final = run_uid_match(self.question_bank, self.df_target)
+            loop = asyncio.get_running_loop()
+            df_final = await loop.run_in_executor(get_cpu_pool(), run_uid_match, self.question_bank, self.df_target)
+            # Guarantee the output columns so the metrics below can index directly
+            for column in MATCH_OUTPUT_COLUMNS:
+                if column not in df_final:
+                    df_final[column] = pd.NA
+            df_final = _shrink(as_categorical(df_final, ("Match_Confidence",)))
+            self._set_frame("df_final", df_final)
             
             # Calculate metrics
-            self.matched_percentage = calculate_matched_percentage(self.df_final)
-            self.high_confidence_matches = len(self.df_final[self.df_final.get("Match_Confidence", "") == "✅ High"])
-            self.low_confidence_matches = len(self.df_final[self.df_final.get("Match_Confidence", "") == "⚠️ Low"])
-            self.no_matches = len(self.df_final[self.df_final.get("Final_UID", pd.Series()).isna()])
+            self.matched_percentage = calculate_matched_percentage(df_final)
+            confidence_counts = df_final["Match_Confidence"].value_counts()
+            self.high_confidence_matches = int(confidence_counts.get("✅ High", 0))
+            self.low_confidence_matches = int(confidence_counts.get("⚠️ Low", 0))
+            self.no_matches = int(df_final["Final_UID"].isna().sum())
             
             self.status_message = f"Matching complete: {self.matched_percentage}% matched"
             
@@ -193,7 +417,12 @@ class AppState(rx.State):
         self.status_message = "Preparing export data..."
         
         try:
-            self.export_non_identity, self.export_identity = prepare_export_data(self.df_final)
+            loop = asyncio.get_running_loop()
+            export_non_identity, export_identity = await loop.run_in_executor(
+                get_cpu_pool(), prepare_export_data, self.df_final
+            )
+            self._set_frame("export_non_identity", export_non_identity)
+            self._set_frame("export_identity", export_identity)
             self.status_message = "Export data ready"
         except Exception as e:
             self.status_message = f"Export preparation failed: {str(e)}"
@@ -211,9 +440,30 @@ class AppState(rx.State):
     def update_selected_surveys(self, surveys: List[str]):
         """Update selected surveys"""
         self.selected_surveys = surveys
+        # "<id> - <title>" labels are parsed once here, deduplicated in order
+        self.selected_survey_ids = list(dict.fromkeys(s.split(" - ", 1)[0] for s in surveys))
 
 # ============= ENHANCED COMPONENTS =============
 
+class Page(IntEnum):
+    """The app's pages; ROUTES maps each to its URL path"""
+    HOME = 0
+    SURVEY_SELECTION = 1
+    SURVEY_CATEGORIZATION = 2
+    UID_MATCHING = 3
+    QUESTION_BANK = 4
+    SURVEY_CREATION = 5
+
+# Each page is its own route, so navigation is a client-side redirect
+ROUTES = {
+    Page.HOME: "/",
+    Page.SURVEY_SELECTION: "/survey_selection",
+    Page.SURVEY_CATEGORIZATION: "/survey_categorization",
+    Page.UID_MATCHING: "/uid_matching",
+    Page.QUESTION_BANK: "/question_bank",
+    Page.SURVEY_CREATION: "/survey_creation",
+}
+
 def status_indicator(connected: bool, service_name: str, message: str):
     """Create a status indicator component"""
     return rx.hstack(
@@ -259,38 +509,86 @@ def metric_card_enhanced(title: str, value: str, description: str = "", color: s
         width="100%"
     )
 
-def loading_overlay():
-    """Loading overlay component"""
-    return rx.cond(
-        AppState.loading,
-        rx.box(
-            rx.vstack(
-                rx.spinner(size="3"),
-                rx.text(AppState.status_message, size="3"),
-                rx.cond(
-                    AppState.progress > 0,
-                    rx.progress(value=AppState.progress, max=100),
-                    rx.box()
-                ),
-                spacing="4",
-                align="center"
-            ),
-            position="fixed",
-            top="0",
-            left="0",
-            width="100vw",
-            height="100vh",
-            background="rgba(0,0,0,0.5)",
-            display="flex",
-            align_items="center",
-            justify_content="center",
-            z_index="1000"
+_OVERLAY_BODY = rx.box(
+    rx.vstack(
+        rx.spinner(size="3"),
+        rx.text(AppState.status_message, size="3"),
+        rx.cond(
+            AppState.progress > 0,
+            rx.progress(value=AppState.progress, max=100),
+            rx.box()
         ),
-        rx.box()
+        spacing="4",
+        align="center"
+    ),
+    position="fixed",
+    top="0",
+    left="0",
+    width="100vw",
+    height="100vh",
+    background="rgba(0,0,0,0.5)",
+    display="flex",
+    align_items="center",
+    justify_content="center",
+    z_index="1000"
+)
+
+def loading_overlay():
+    """Loading overlay component; the body is built once and only gated here"""
+    return rx.cond(AppState.loading, _OVERLAY_BODY, rx.fragment())
+
+def _connection_block():
+    """Sidebar connection status, bound only to the connection vars"""
+    return rx.vstack(
+        rx.text("🔗 Connection Status", weight="bold", size="4"),
+        status_indicator(AppState.sm_connected, "📊 SurveyMonkey", AppState.sm_message),
+        status_indicator(AppState.sf_connected, "❄️ Snowflake", AppState.sf_message),
+        spacing="2",
+        width="100%"
+    )
+
+def _quick_stats_block():
+    """Sidebar quick stats, bound only to the metric vars"""
+    return rx.vstack(
+        rx.text("📊 Quick Stats", weight="bold", size="3"),
+        rx.text(f"Surveys: {AppState.surveys_count}", size="2"),
+        rx.text(f"Questions: {AppState.total_questions}", size="2"),
+        rx.text(f"Main: {AppState.main_questions}", size="2"),
+        rx.text(f"Match Rate: {AppState.matched_percentage}%", size="2"),
+        spacing="1",
+        width="100%"
+    )
+
+# (page, icon, label) for each sidebar entry
+NAV_ITEMS = (
+    (Page.HOME, "home", "Home"),
+    (Page.SURVEY_SELECTION, "clipboard", "Survey Selection"),
+    (Page.SURVEY_CATEGORIZATION, "folder", "AMI Categories"),
+    (Page.UID_MATCHING, "settings", "UID Matching"),
+    (Page.QUESTION_BANK, "book", "Question Bank"),
+    (Page.SURVEY_CREATION, "plus", "Survey Creation"),
+)
+
+@rx.memo
+def _nav_buttons(current_page: rx.Var[str]) -> rx.Component:
+    """Sidebar navigation; re-renders only when the current route changes"""
+    return rx.vstack(
+        *[
+            rx.button(
+                rx.hstack(rx.icon(icon), label, spacing="2"),
+                on_click=rx.redirect(ROUTES[page]),
+                variant=rx.cond(current_page == ROUTES[page], "soft", "ghost"),
+                width="100%",
+                justify="start"
+            )
+            for page, icon, label in NAV_ITEMS
+        ],
+        spacing="1",
+        width="100%"
     )
 
-def navigation_sidebar():
-    """Enhanced navigation sidebar"""
+def navigation_sidebar(current_page: rx.Var[str]):
+    """Enhanced navigation sidebar, highlighting the current route"""
     return rx.vstack(
         # Header
         rx.vstack(
@@ -302,76 +600,17 @@ def navigation_sidebar():
         rx.divider(),
         
         # Connection status
-        rx.vstack(
-            rx.text("🔗 Connection Status", weight="bold", size="4"),
-            status_indicator(AppState.sm_connected, "📊 SurveyMonkey", AppState.sm_message),
-            status_indicator(AppState.sf_connected, "❄️ Snowflake", AppState.sf_message),
-            spacing="2",
-            width="100%"
-        ),
+        _connection_block(),
         
         rx.divider(),
         
         # Navigation buttons
-        rx.vstack(
-            rx.button(
-                rx.hstack(rx.icon("home"), "Home", spacing="2"),
-                on_click=AppState.navigate_to("home"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            rx.button(
-                rx.hstack(rx.icon("clipboard"), "Survey Selection", spacing="2"),
-                on_click=AppState.navigate_to("survey_selection"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            rx.button(
-                rx.hstack(rx.icon("folder"), "AMI Categories", spacing="2"),
-                on_click=AppState.navigate_to("survey_categorization"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            rx.button(
-                rx.hstack(rx.icon("settings"), "UID Matching", spacing="2"),
-                on_click=AppState.navigate_to("uid_matching"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            rx.button(
-                rx.hstack(rx.icon("book"), "Question Bank", spacing="2"),
-                on_click=AppState.navigate_to("question_bank"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            rx.button(
-                rx.hstack(rx.icon("plus"), "Survey Creation", spacing="2"),
-                on_click=AppState.navigate_to("survey_creation"),
-                variant="ghost",
-                width="100%",
-                justify="start"
-            ),
-            spacing="1",
-            width="100%"
-        ),
+        _nav_buttons(current_page=current_page),
         
         rx.divider(),
         
         # Quick stats
-        rx.vstack(
-            rx.text("📊 Quick Stats", weight="bold", size="3"),
-            rx.text(f"Surveys: {len(AppState.surveys)}", size="2"),
-            rx.text(f"Questions: {AppState.total_questions}", size="2"),
-            rx.text(f"Main: {AppState.main_questions}", size="2"),
-            rx.text(f"Match Rate: {AppState.matched_percentage}%", size="2"),
-            spacing="1",
-            width="100%"
-        ),
+        _quick_stats_block(),
         
         spacing="4",
         padding="4",
@@ -383,22 +622,108 @@ def navigation_sidebar():
 
 # ============= PAGE IMPLEMENTATIONS =============
 
+# Applied to each page's root so the layout needs no extra wrapper element
+PAGE_STYLE = {"flex": "1", "overflow": "auto", "background": "white"}
+
+@rx.memo
+def page_header(title: rx.Var[str], subtitle: rx.Var[str]) -> rx.Component:
+    """Static page heading and description, skipped on re-render while props are unchanged"""
+    return rx.fragment(
+        rx.heading(title, size="6"),
+        rx.text(subtitle),
+    )
+
+def _workflow_card(title: str, intro: str, items: List[str], button_label: str, page: Page):
+    """One step card of the home page workflow guide"""
+    return rx.card(
+        rx.vstack(
+            rx.heading(title, size="4"),
+            rx.text(intro),
+            rx.list(*[rx.list.item(item) for item in items]),
+            rx.button(
+                button_label,
+                on_click=rx.redirect(ROUTES[page]),
+                width="100%",
+                size="2"
+            ),
+            spacing="3",
+            align="start"
+        ),
+        padding="4",
+        height="200px"
+    )
+
+# Static page headers, built once at import and shared by every render
+_HOME_HEADER = rx.vstack(
+    rx.heading("🏠 Welcome to Enhanced UID Matcher", size="7"),
+    rx.text("SurveyMonkey surveys → Snowflake reference → UID Final mapping → Enhanced question bank"),
+    spacing="2",
+    align="start"
+)
+_SURVEY_SELECTION_HEADER = page_header(
+    title="📋 Survey Selection & Question Bank",
+    subtitle="📊 Data Source: SurveyMonkey API - Survey selection and question extraction",
+)
+_CATEGORIZATION_HEADER = page_header(
+    title="📊 AMI Survey Categorization",
+    subtitle="📂 Data Source: SurveyMonkey questions/choices - AMI structure categorization",
+)
+_UID_MATCHING_HEADER = page_header(
+    title="🔧 UID Matching & Configuration",
+    subtitle="🔄 Process: Match survey questions → Snowflake references → Assign UIDs",
+)
+_QUESTION_BANK_HEADER = page_header(
+    title="📚 Enhanced Question Bank Viewer",
+    subtitle="❄️ Data Source: Snowflake + UID Final Reference - Enhanced question bank",
+)
+_SURVEY_CREATION_HEADER = page_header(
+    title="🏗️ Survey Creation",
+    subtitle="🏗️ Process: Design survey → Configure questions → Deploy to SurveyMonkey",
+)
+
+# Static workflow guide, built once at import rather than on every home_page render
+_WORKFLOW_CARDS = rx.grid(
+    _workflow_card(
+        "1️⃣ Survey Selection", "Select and analyze surveys:",
+        ["Browse available surveys", "Extract questions with IDs", "Review question bank"],
+        "📋 Start Survey Selection", Page.SURVEY_SELECTION,
+    ),
+    _workflow_card(
+        "2️⃣ AMI Structure", "Categorize with AMI structure:",
+        ["Survey Stage classification", "Respondent Type grouping", "Programme alignment"],
+        "📊 View AMI Categories", Page.SURVEY_CATEGORIZATION,
+    ),
+    _workflow_card(
+        "3️⃣ Question Bank", "Enhanced question bank:",
+        ["Snowflake reference questions", "UID Final reference", "Unique UID table creation"],
+        "📖 View Question Bank", Page.QUESTION_BANK,
+    ),
+    columns="3",
+    spacing="4",
+    width="100%"
+)
+
 def home_page():
     """Enhanced home dashboard"""
     return rx.vstack(
         # Header
         rx.hstack(
-            rx.vstack(
-                rx.heading("🏠 Welcome to Enhanced UID Matcher", size="7"),
-                rx.text("SurveyMonkey surveys → Snowflake reference → UID Final mapping → Enhanced question bank"),
-                spacing="2",
-                align="start"
-            ),
-            rx.button(
-                "🔄 Initialize App",
-                on_click=AppState.initialize_app,
-                size="3",
-                disabled=AppState.loading
+            _HOME_HEADER,
+            rx.hstack(
+                rx.button(
+                    "🚀 Initialize App",
+                    on_click=AppState.initialize_app(False),
+                    size="3",
+                    disabled=AppState.loading
+                ),
+                rx.button(
+                    "🔄 Refresh",
+                    on_click=AppState.refresh_app,
+                    size="3",
+                    variant="outline",
+                    disabled=AppState.loading
+                ),
+                spacing="2"
             ),
             justify="between",
             width="100%"
@@ -418,8 +743,8 @@ def home_page():
         # Metrics dashboard
         rx.grid(
             metric_card_enhanced("🔄 Status", "Active", "System operational", "green"),
-            metric_card_enhanced("📊 SM Surveys", str(len(AppState.surveys)), "Available surveys"),
-            metric_card_enhanced("🎯 UID Final Refs", str(len(UID_FINAL_REFERENCE)), "Reference mappings"),
+            metric_card_enhanced("📊 SM Surveys", AppState.surveys_count.to_string(), "Available surveys"),
+            metric_card_enhanced("🎯 UID Final Refs", str(_UFR_LEN), "Reference mappings"),
             metric_card_enhanced("⚡ Match Rate", f"{AppState.matched_percentage}%", "Current matching accuracy", "purple"),
             columns="4",
             spacing="4",
@@ -432,8 +757,8 @@ def home_page():
                 rx.heading("🎯 UID Final Reference", size="5"),
                 rx.text("New Feature: UID Final reference mapping loaded from provided file", weight="bold"),
                 rx.hstack(
-                    rx.text(f"• {len(UID_FINAL_REFERENCE)} questions mapped to UID Final values"),
-                    rx.text(f"• Range: {min(UID_FINAL_REFERENCE.values())}-{max(UID_FINAL_REFERENCE.values())}"),
+                    rx.text(f"• {_UFR_LEN} questions mapped to UID Final values"),
+                    rx.text(f"• Range: {_UFR_MIN}-{_UFR_MAX}"),
                     spacing="6"
                 ),
                 rx.text("• Used in Question Bank viewer for enhanced reference"),
@@ -448,94 +773,27 @@ def home_page():
         
         # Workflow guide
         rx.heading("🚀 Recommended Workflow", size="5"),
-        rx.grid(
-            rx.card(
-                rx.vstack(
-                    rx.heading("1️⃣ Survey Selection", size="4"),
-                    rx.text("Select and analyze surveys:"),
-                    rx.list(
-                        rx.list.item("Browse available surveys"),
-                        rx.list.item("Extract questions with IDs"),
-                        rx.list.item("Review question bank")
-                    ),
-                    rx.button(
-                        "📋 Start Survey Selection",
-                        on_click=AppState.navigate_to("survey_selection"),
-                        width="100%",
-                        size="2"
-                    ),
-                    spacing="3",
-                    align="start"
-                ),
-                padding="4",
-                height="200px"
-            ),
-            rx.card(
-                rx.vstack(
-                    rx.heading("2️⃣ AMI Structure", size="4"),
-                    rx.text("Categorize with AMI structure:"),
-                    rx.list(
-                        rx.list.item("Survey Stage classification"),
-                        rx.list.item("Respondent Type grouping"),
-                        rx.list.item("Programme alignment")
-                    ),
-                    rx.button(
-                        "📊 View AMI Categories",
-                        on_click=AppState.navigate_to("survey_categorization"),
-                        width="100%",
-                        size="2"
-                    ),
-                    spacing="3",
-                    align="start"
-                ),
-                padding="4",
-                height="200px"
-            ),
-            rx.card(
-                rx.vstack(
-                    rx.heading("3️⃣ Question Bank", size="4"),
-                    rx.text("Enhanced question bank:"),
-                    rx.list(
-                        rx.list.item("Snowflake reference questions"),
-                        rx.list.item("UID Final reference"),
-                        rx.list.item("Unique UID table creation")
-                    ),
-                    rx.button(
-                        "📖 View Question Bank",
-                        on_click=AppState.navigate_to("question_bank"),
-                        width="100%",
-                        size="2"
-                    ),
-                    spacing="3",
-                    align="start"
-                ),
-                padding="4",
-                height="200px"
-            ),
-            columns="3",
-            spacing="4",
-            width="100%"
-        ),
+        _WORKFLOW_CARDS,
         
         spacing="6",
         padding="6",
-        width="100%"
+        width="100%",
+        **PAGE_STYLE
     )
 
 def survey_selection_page():
     """Enhanced survey selection page"""
     return rx.vstack(
-        rx.heading("📋 Survey Selection & Question Bank", size="6"),
-        rx.text("📊 Data Source: SurveyMonkey API - Survey selection and question extraction"),
+        _SURVEY_SELECTION_HEADER,
         
         rx.cond(
-            len(AppState.surveys) == 0,
+            AppState.surveys_count == 0,
             rx.card(
                 rx.vstack(
                     rx.text("⚠️ No surveys available. Check SurveyMonkey connection.", size="4"),
                     rx.button(
                         "🔄 Reload Surveys",
-                        on_click=AppState.load_initial_data,
+                        on_click=AppState.refresh_app,
                         disabled=AppState.loading
                     ),
                     spacing="3"
@@ -548,7 +806,7 @@ def survey_selection_page():
                 rx.heading("🔍 Select Surveys", size="4"),
                 rx.card(
                     rx.vstack(
-                        rx.text(f"Available surveys: {len(AppState.surveys)}", size="3"),
+                        rx.text(f"Available surveys: {AppState.surveys_count}", size="3"),
                         # Note: In real implementation, you'd need a proper multiselect component
                         rx.text("Survey multiselect component would be implemented here", size="2", color="gray"),
                         rx.button(
@@ -577,12 +835,12 @@ def survey_selection_page():
                         rx.hstack(
                             rx.button(
                                 "📊 Proceed to AMI Categories",
-                                on_click=AppState.navigate_to("survey_categorization"),
+                                on_click=rx.redirect(ROUTES[Page.SURVEY_CATEGORIZATION]),
                                 size="3"
                             ),
                             rx.button(
                                 "🔧 Proceed to UID Matching",
-                                on_click=AppState.navigate_to("uid_matching"),
+                                on_click=rx.redirect(ROUTES[Page.UID_MATCHING]),
                                 variant="outline",
                                 size="3"
                             ),
@@ -598,14 +856,14 @@ def survey_selection_page():
         
         spacing="4",
         padding="6",
-        width="100%"
+        width="100%",
+        **PAGE_STYLE
     )
 
 def survey_categorization_page():
     """AMI survey categorization page"""
     return rx.vstack(
-        rx.heading("📊 AMI Survey Categorization", size="6"),
-        rx.text("📂 Data Source: SurveyMonkey questions/choices - AMI structure categorization"),
+        _CATEGORIZATION_HEADER,
         
         # AMI Structure Overview
         rx.card(
@@ -638,7 +896,7 @@ def survey_categorization_page():
         
         # Categorization controls
         rx.cond(
-            AppState.df_target is not None,
+            AppState.has_df_target,
             rx.vstack(
                 rx.button(
                     "🔄 Run AMI Categorization",
@@ -647,7 +905,7 @@ def survey_categorization_page():
                     size="3"
                 ),
                 rx.cond(
-                    AppState.categorized_questions is not None,
+                    AppState.has_categorized_questions,
                     rx.card(
                         rx.text("✅ Categorization complete! Questions categorized by AMI structure.", size="3"),
                         background="green.50",
@@ -666,14 +924,14 @@ def survey_categorization_page():
         
         spacing="4",
         padding="6",
-        width="100%"
+        width="100%",
+        **PAGE_STYLE
     )
 
 def uid_matching_page():
     """UID matching page"""
     return rx.vstack(
-        rx.heading("🔧 UID Matching & Configuration", size="6"),
-        rx.text("🔄 Process: Match survey questions → Snowflake references → Assign UIDs"),
+        _UID_MATCHING_HEADER,
         
         # Current data status
         rx.card(
@@ -693,7 +951,7 @@ def uid_matching_page():
         
         # Matching controls
         rx.cond(
-            AppState.df_target is not None,
+            AppState.has_df_target,
             rx.vstack(
                 rx.button(
                     "🚀 Run UID Matching",
@@ -704,7 +962,7 @@ def uid_matching_page():
                 
                 # Matching results
                 rx.cond(
-                    AppState.df_final is not None,
+                    AppState.has_df_final,
                     rx.vstack(
                         rx.heading("🎯 Matching Results", size="4"),
                         rx.grid(
@@ -726,7 +984,7 @@ def uid_matching_page():
                                 size="3"
                             ),
                             rx.cond(
-                                (AppState.export_non_identity is not None) | (AppState.export_identity is not None),
+                                AppState.export_ready,
                                 rx.text("✅ Export data ready", color="green"),
                                 rx.box()
                             ),
@@ -747,20 +1005,20 @@ def uid_matching_page():
         
         spacing="4",
         padding="6",
-        width="100%"
+        width="100%",
+        **PAGE_STYLE
     )
 
 def question_bank_page():
     """Enhanced question bank page"""
     return rx.vstack(
-        rx.heading("📚 Enhanced Question Bank Viewer", size="6"),
-        rx.text("❄️ Data Source: Snowflake + UID Final Reference - Enhanced question bank"),
+        _QUESTION_BANK_HEADER,
         
         # UID Final Reference section
         rx.card(
             rx.vstack(
                 rx.heading("🎯 UID Final Reference (Cached)", size="4"),
-                rx.text(f"Loaded {len(UID_FINAL_REFERENCE)} authoritative question-to-UID Final mappings"),
+                rx.text(f"Loaded {_UFR_LEN} authoritative question-to-UID Final mappings"),
                 rx.text("This is the master reference for UID Final assignments, independent of Snowflake connection."),
                 spacing="2"
             ),
@@ -770,13 +1028,13 @@ def question_bank_page():
         
         # Metrics
         rx.grid(
-            metric_card_enhanced("📊 Total UID Final Records", str(len(UID_FINAL_REFERENCE))),
-            metric_card_enhanced("🎯 Unique UID Finals", str(len(set(UID_FINAL_REFERENCE.values())))),
+            metric_card_enhanced("📊 Total UID Final Records", str(_UFR_LEN)),
+            metric_card_enhanced("🎯 Unique UID Finals", str(_UFR_UNIQUE)),
             metric_card_enhanced("📈 UID Final Range", 
-                                f"{min(UID_FINAL_REFERENCE.values())}-{max(UID_FINAL_REFERENCE.values())}"),
+                                f"{_UFR_MIN}-{_UFR_MAX}"),
             metric_card_enhanced("❄️ Snowflake Status", 
-                                "Connected" if AppState.sf_connected else "Disconnected",
-                                color="green" if AppState.sf_connected else "red"),
+                                rx.cond(AppState.sf_connected, "Connected", "Disconnected"),
+                                color=rx.cond(AppState.sf_connected, "green", "red")),
             columns="4",
             spacing="4"
         ),
@@ -803,81 +1061,107 @@ def question_bank_page():
         
         spacing="4",
         padding="6",
-        width="100%"
+        width="100%",
+        **PAGE_STYLE
     )
 
-def survey_creation_page():
-    """Survey creation page placeholder"""
-    return rx.vstack(
-        rx.heading("🏗️ Survey Creation", size="6"),
-        rx.text("🏗️ Process: Design survey → Configure questions → Deploy to SurveyMonkey"),
-        
-        rx.card(
-            rx.vstack(
-                rx.heading("🚧 Under Development", size="4"),
-                rx.text("Survey creation functionality will be implemented in future version."),
-                rx.text("This feature will allow you to:"),
-                rx.list(
-                    rx.list.item("Design new surveys"),
-                    rx.list.item("Configure questions from the question bank"),
-                    rx.list.item("Deploy directly to SurveyMonkey"),
-                    rx.list.item("Track survey performance")
-                ),
-                spacing="3"
-            ),
-            background="yellow.50",
-            padding="4"
+_UNDER_DEV_CARD = rx.card(
+    rx.vstack(
+        rx.heading("🚧 Under Development", size="4"),
+        rx.text("Survey creation functionality will be implemented in future version."),
+        rx.text("This feature will allow you to:"),
+        rx.list(
+            rx.list.item("Design new surveys"),
+            rx.list.item("Configure questions from the question bank"),
+            rx.list.item("Deploy directly to SurveyMonkey"),
+            rx.list.item("Track survey performance")
         ),
-        
-        spacing="4",
-        padding="6",
-        width="100%"
-    )
+        spacing="3"
+    ),
+    background="yellow.50",
+    padding="4"
+)
 
-def page_router():
-    """Enhanced page router with all pages"""
-    return rx.match(
-        AppState.current_page,
-        ("home", home_page()),
-        ("survey_selection", survey_selection_page()),
-        ("survey_categorization", survey_categorization_page()),
-        ("uid_matching", uid_matching_page()),
-        ("question_bank", question_bank_page()),
-        ("survey_creation", survey_creation_page()),
-        home_page()  # Default fallback
-    )
+# Entirely static, so built once at import
+_SURVEY_CREATION_BODY = rx.vstack(
+    _SURVEY_CREATION_HEADER,
+    _UNDER_DEV_CARD,
+    spacing="4",
+    padding="6",
+    width="100%",
+    **PAGE_STYLE
+)
+
+@rx.memo
+def survey_creation_page() -> rx.Component:
+    """Survey creation page placeholder (state-free, so memoized whole)"""
+    return _SURVEY_CREATION_BODY
+
+# Each page tree is built exactly once, at import
+PAGES = {
+    Page.HOME: home_page(),
+    Page.SURVEY_SELECTION: survey_selection_page(),
+    Page.SURVEY_CATEGORIZATION: survey_categorization_page(),
+    Page.UID_MATCHING: uid_matching_page(),
+    Page.QUESTION_BANK: question_bank_page(),
+    Page.SURVEY_CREATION: survey_creation_page(),
+}
+
+@rx.memo
+def app_shell(children: rx.Var[rx.Component]) -> rx.Component:
+    """Shared chrome around every page: loading overlay and navigation sidebar
 
-def index():
-    """Main application layout with loading overlay"""
+    Memoized, so the chrome is compiled once as a shared component that
+    each route's chunk references instead of inlining its own copy.
+    """
     return rx.fragment(
         loading_overlay(),
         rx.hstack(
-            navigation_sidebar(),
-            rx.box(
-                page_router(),
-                flex="1",
-                overflow="auto",
-                background="white"
-            ),
+            navigation_sidebar(AppState.router.page.path),
+            children,
             width="100%",
             height="100vh",
             spacing="0"
         )
     )
 
+def layout(page: rx.Component) -> rx.Component:
+    """Wrap a page in the shared app shell"""
+    return app_shell(page)
+
 # ============= APP CONFIGURATION =============
 
+# Read-only app-wide style and stylesheets, shared rather than rebuilt
+_APP_STYLE = MappingProxyType({
+    "font_family": "Inter, sans-serif",
+    "background": "#f8fafc"
+})
+# Hosted Inter; display=swap shows the fallback font until it arrives
+_APP_STYLESHEETS = (
+    "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap",
+)
+
+# Open the font origins early, so the stylesheet and font files are not
+# held up by DNS/TLS setup
+_HEAD_COMPONENTS = [
+    rx.el.link(rel="preconnect", href="https://fonts.googleapis.com"),
+    rx.el.link(rel="preconnect", href="https://fonts.gstatic.com", cross_origin=""),
+]
+
 app = rx.App(
-    style={
-        "font_family": "Inter, sans-serif",
-        "background": "#f8fafc"
-    },
-    stylesheets=[
-        "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap"
-    ]
+    style=_APP_STYLE,
+    stylesheets=_APP_STYLESHEETS,
+    head_components=_HEAD_COMPONENTS
 )
+app.register_lifespan_task(cpu_pool_lifespan)
 
-app.add_page(index, route="/", title="UID Matcher Enhanced")
+# One route per page, so each page is compiled into its own chunk
+for page, _icon, label in NAV_ITEMS:
+    app.add_page(
+        layout(PAGES[page]),
+        route=ROUTES[page],
+        title=f"{label} · UID Matcher Enhanced"
+    )
 
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file